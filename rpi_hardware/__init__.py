@@ -1,4 +1,7 @@
-from .ds28cm00 import DS28CM00
+from .ds28cm00 import DS28CM00, DS28CM00IdentityCache
 from .hcf4094 import HCF4094
 from .tmp275 import TMP275
 from .ina219 import INA219
+from .discovery import PresenceMap, scan_bus, scan_buses
+from .polling import SensorPoller
+from .timeseries import TimeSeriesStore
@@ -0,0 +1,193 @@
+import argparse
+import json
+import platform
+import sys
+import timeit
+from collections import OrderedDict
+
+from .ds28cm00 import DS28CM00
+from .hcf4094 import HCF4094
+from .ina219 import INA219
+from .tmp275 import TMP275
+from .mocked import GPIO, FakeDS28CM00, FakeINA219, FakeTMP275, HCF4094Capture
+from .mocked import smbus
+from .util.crc import crc8_value
+from .util.files import atomic_write
+
+# Name: setup method returning the callable to time.  In order of registration.
+BENCHMARKS = OrderedDict()
+
+_OUT_EN = 20
+_STROBE = 19
+_CLOCK = 26
+_DATA = 21
+
+
+def benchmark(name):
+    """ Register setup method for a benchmark. """
+    def _register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return _register
+
+
+def _hcf4094():
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    return HCF4094(GPIO, _DATA, _CLOCK, _STROBE, _OUT_EN, enable_output_immediate=True)
+
+
+@benchmark('hcf4094.shift_data')
+def _hcf4094_shift_data():
+    hcf = _hcf4094()
+    data = [1, 0] * 144
+    return lambda: hcf.shift_data(data)
+
+
+@benchmark('hcf4094.shift_data.capture')
+def _hcf4094_shift_data_capture():
+    hcf = _hcf4094()
+    HCF4094Capture(GPIO, _DATA, _CLOCK, _STROBE, _OUT_EN, [0] * 288, lambda changes: None)
+    data = [1, 0] * 144
+    return lambda: hcf.shift_data(data)
+
+
+@benchmark('fake_gpio.output.callback')
+def _fake_gpio_output_callback():
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(_CLOCK, GPIO.OUT, initial=GPIO.LOW)
+    GPIO.add_event_callback(_CLOCK, GPIO.RISING, lambda: None)
+    GPIO.add_event_callback(_CLOCK, GPIO.FALLING, lambda: None)
+
+    def toggle():
+        GPIO.output(_CLOCK, GPIO.HIGH)
+        GPIO.output(_CLOCK, GPIO.LOW)
+    return toggle
+
+
+@benchmark('crc8_value')
+def _crc8_value():
+    data = bytes(range(256)) * 4
+    return lambda: crc8_value(data)
+
+
+@benchmark('ds28cm00.serial_number')
+def _ds28cm00_serial_number():
+    bus = smbus.SMBus(1)
+    FakeDS28CM00(bus, [1, 2, 3, 4, 5, 6])
+    # New object each call, as serial number is cached after the first read
+    return lambda: DS28CM00(bus).serial_number
+
+
+@benchmark('tmp275.read_temperature')
+def _tmp275_read_temperature():
+    bus = smbus.SMBus(1)
+    FakeTMP275(bus, 0x48, temperature=21.5)
+    return TMP275(bus, 0x48).read_temperature
+
+
+@benchmark('ina219.shunt_voltage')
+def _ina219_shunt_voltage():
+    bus = smbus.SMBus(1)
+    FakeINA219(bus, 0x41).set_measurement(10.0, 5000)
+    return INA219(bus, address=0x41).shunt_voltage
+
+
+@benchmark('ina219.snapshot')
+def _ina219_snapshot():
+    bus = smbus.SMBus(1)
+    FakeINA219(bus, 0x41).set_measurement(10.0, 5000)
+    ina = INA219(bus, address=0x41, shunt_ohms=0.1, max_expected_amps=0.4)
+    return ina.snapshot
+
+
+def run(names=None, repeat=5, min_time=0.2):
+    """
+    Time benchmarks.
+
+    Each is called in loops of at least min_time seconds, repeat times.  The fastest loop is kept,
+    as slower ones are slowed by other activity on the machine, not by the code.
+
+    :param names: benchmark names to run, None for all
+    :param repeat: loops timed per benchmark
+    :param min_time: minimum seconds per loop
+    :return: dict of name: {'seconds': best seconds per call, 'number': calls per loop}
+    """
+    results = OrderedDict()
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError('Unknown benchmark {}.  Valid values {}.'.format(name, ', '.join(BENCHMARKS)))
+        timer = timeit.Timer(BENCHMARKS[name]())
+        number = 1
+        while timer.timeit(number) < min_time:
+            number *= 2
+        best = min(timer.repeat(repeat, number))
+        results[name] = {'seconds': best / number, 'number': number}
+    return results
+
+
+def save(results, path):
+    """ Save results as JSON baseline, with details of the machine they were taken on. """
+    baseline = {'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results}
+    atomic_write(path, json.dumps(baseline, indent=2, sort_keys=True))
+
+
+def load(path):
+    """
+    :return: results of baseline saved with save
+    """
+    with open(path) as baseline_file:
+        return json.load(baseline_file)['results']
+
+
+def compare(baseline, results, tolerance=0.1):
+    """
+    Find benchmarks slower than baseline by more than tolerance.
+
+    :param baseline: results from load
+    :param results: results from run
+    :param tolerance: allowed slow down, 0.1 is 10%
+    :return: list of (name, baseline seconds, seconds, ratio) for regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['seconds'] / baseline[name]['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append((name, baseline[name]['seconds'], result['seconds'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m rpi_hardware.benchmarks',
+                                     description='Benchmark drivers against mocked hardware.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, default all: ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--save', metavar='PATH', help='save results as baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare results with baseline, exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slow down for compare, default 0.1')
+    parser.add_argument('--repeat', type=int, default=5, help='loops timed per benchmark, default 5')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, repeat=args.repeat)
+    baseline = load(args.compare) if args.compare else {}
+    for name, result in results.items():
+        line = '{:<30} {:>12.3f} us'.format(name, result['seconds'] * 1e6)
+        if name in baseline:
+            line += '  {:>+7.1%}'.format(result['seconds'] / baseline[name]['seconds'] - 1)
+        print(line)
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(baseline, results, args.tolerance)
+        for name, _, _, ratio in regressions:
+            print('Regression: {} is {:.1%} slower than baseline.'.format(name, ratio - 1))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .ds28cm00 import DS28CM00
+from .ina219 import INA219
+from .tmp275 import TMP275
+from .util.files import atomic_write
+
+# Order matters when address ranges overlap.  The first driver declaring an address claims it,
+# unless the device can be identified, as TMP275 and INA219 sharing 0x48-0x4f are by _identify.
+DRIVERS = (TMP275, INA219, DS28CM00)
+
+# Ranges i2cdetect probes with a read byte, as a quick write can corrupt EEPROMs and
+# lock up some other chips found there
+_READ_PROBE_RANGES = (range(0x30, 0x38), range(0x50, 0x60))
+
+
+def _address_claims(drivers):
+    """
+    Map each address declared by drivers to the drivers declaring it.
+
+    :param drivers: sequence of driver classes with ADDRESS_RANGE
+    :return: OrderedDict of address: list of driver classes in drivers order, in address order
+    """
+    claims = {}
+    for driver in drivers:
+        for address in driver.ADDRESS_RANGE:
+            claims.setdefault(address, []).append(driver)
+    return OrderedDict(sorted(claims.items()))
+
+
+def _identify(smbus_ref, address, candidates):
+    """
+    Pick the driver for a device found at an address claimed by more than one driver.
+
+    TMP275 and INA219 are told apart by reading register 0, MSB first.  On the INA219 it is the
+    configuration, which powers on as 0x399F and has the low bits set in every operating mode other
+    than power down.  On the TMP275 it is temperature, which always has the low 4 bits clear.
+    Other overlaps fall back to the first candidate.
+
+    :param smbus_ref: smbus object
+    :param address: I2C address of device present
+    :param candidates: driver classes claiming address, in DRIVERS order
+    :return: driver class
+    """
+    if TMP275 in candidates and INA219 in candidates:
+        try:
+            msb, lsb = smbus_ref.read_i2c_block_data(address, 0x00, 2)
+        except IOError:
+            return candidates[0]
+        return INA219 if not msb & 0xc0 and lsb & 0x0f else TMP275
+    return candidates[0]
+
+
+def probe(smbus_ref, address):
+    """
+    Check if a device acknowledges address, using a quick write like i2cdetect.
+
+    As i2cdetect does, addresses 0x30-0x37 and 0x50-0x5f are probed with a read byte instead.
+
+    :param smbus_ref: smbus object
+    :param address: I2C address
+    :return: True if device present
+    """
+    try:
+        if any(address in probe_range for probe_range in _READ_PROBE_RANGES):
+            smbus_ref.read_byte(address)
+        else:
+            smbus_ref.write_quick(address)
+    except IOError:
+        return False
+    return True
+
+
+def scan_bus(smbus_ref, drivers=DRIVERS):
+    """
+    Probe only the addresses drivers can use on a single bus.
+
+    Where drivers share an address, the device found is identified by reading it, see _identify.
+
+    :param smbus_ref: smbus object
+    :param drivers: sequence of driver classes, see DRIVERS for ordering
+    :return: dict of address: driver class name for devices found
+    """
+    return {address: _identify(smbus_ref, address, candidates).__name__
+            for address, candidates in _address_claims(drivers).items()
+            if probe(smbus_ref, address)}
+
+
+def scan_buses(bus_refs, drivers=DRIVERS, max_workers=None):
+    """
+    Scan several buses in parallel, one thread per bus.
+
+    :param bus_refs: dict of bus_number: smbus object
+    :param drivers: sequence of driver classes, see DRIVERS for ordering
+    :param max_workers: thread limit, defaults to one per bus
+    :return: PresenceMap
+    """
+    bus_numbers = list(bus_refs.keys())
+    if not bus_numbers:
+        return PresenceMap()
+    with ThreadPoolExecutor(max_workers=max_workers or len(bus_numbers)) as executor:
+        results = executor.map(lambda bus_number: scan_bus(bus_refs[bus_number], drivers), bus_numbers)
+        buses = dict(zip(bus_numbers, results))
+    return PresenceMap(buses, drivers=drivers)
+
+
+class PresenceMap(object):
+    """
+    Record of which devices are fitted on which bus, as found by scan_buses.
+
+    A map can be saved and loaded, so a full scan is not needed at every start up.  Loaded entries
+    are revalidated lazily, by probing only the recorded addresses of a bus the first time drivers
+    are built for it.  Devices added since the save are not found without a new scan.
+    """
+
+    def __init__(self, buses=None, drivers=DRIVERS, scan_time=None):
+        """
+        :param buses: dict of bus_number: {address: driver class name}
+        :param drivers: sequence of driver classes names refer to
+        :param scan_time: time.time() of scan, defaults to now
+        """
+        self._buses = {bus_number: dict(devices) for bus_number, devices in (buses or {}).items()}
+        self._drivers = {driver.__name__: driver for driver in drivers}
+        self.scan_time = time.time() if scan_time is None else scan_time
+        self._validated = set()
+
+    def __contains__(self, bus_number):
+        return bus_number in self._buses
+
+    def __getitem__(self, bus_number):
+        return dict(self._buses[bus_number])
+
+    def buses(self):
+        return sorted(self._buses.keys())
+
+    def addresses(self, bus_number, driver=None):
+        """
+        Addresses of devices present on bus.
+
+        :param bus_number: bus to look at
+        :param driver: only addresses for this driver class
+        :return: sorted list of addresses
+        """
+        return sorted(address for address, name in self._buses.get(bus_number, {}).items()
+                      if driver is None or name == driver.__name__)
+
+    def revalidate(self, bus_number, smbus_ref):
+        """
+        Probe recorded addresses on bus and drop any device that no longer answers.
+
+        :param bus_number: bus to revalidate
+        :param smbus_ref: smbus object for bus
+        :return: list of addresses removed
+        """
+        devices = self._buses.get(bus_number, {})
+        missing = [address for address in sorted(devices) if not probe(smbus_ref, address)]
+        for address in missing:
+            del devices[address]
+        self._validated.add(bus_number)
+        return missing
+
+    def build_drivers(self, bus_refs, revalidate=True):
+        """
+        Create driver objects for every device present.
+
+        :param bus_refs: dict of bus_number: smbus object
+        :param revalidate: probe recorded addresses of a bus before first use
+        :return: dict of bus_number: {address: driver object}
+        """
+        built = {}
+        for bus_number, smbus_ref in bus_refs.items():
+            if bus_number not in self._buses:
+                continue
+            if revalidate and bus_number not in self._validated:
+                self.revalidate(bus_number, smbus_ref)
+            built[bus_number] = {address: self._create(self._drivers[name], smbus_ref, address)
+                                 for address, name in sorted(self._buses[bus_number].items())}
+        return built
+
+    @staticmethod
+    def _create(driver, smbus_ref, address):
+        if len(driver.ADDRESS_RANGE) == 1:
+            # Fixed address device
+            return driver(smbus_ref)
+        return driver(smbus_ref, address=address)
+
+    def to_dict(self):
+        return {'scan_time': self.scan_time,
+                'buses': {str(bus_number): {str(address): name for address, name in devices.items()}
+                          for bus_number, devices in self._buses.items()}}
+
+    @classmethod
+    def from_dict(cls, data, drivers=DRIVERS):
+        buses = {int(bus_number): {int(address): name for address, name in devices.items()}
+                 for bus_number, devices in data['buses'].items()}
+        return cls(buses, drivers=drivers, scan_time=data['scan_time'])
+
+    def save(self, path):
+        """ Atomically write presence map to path as JSON. """
+        atomic_write(path, json.dumps(self.to_dict(), sort_keys=True))
+
+    @classmethod
+    def load(cls, path, drivers=DRIVERS):
+        """
+        Load presence map saved with save.  Entries are revalidated on first use by build_drivers.
+
+        :param path: file written by save
+        :param drivers: sequence of driver classes names refer to
+        :return: PresenceMap
+        """
+        with open(path) as map_file:
+            return cls.from_dict(json.load(map_file), drivers=drivers)
@@ -1,4 +1,10 @@
-from .util.crc import crc8_check
+import errno
+import json
+import threading
+from time import monotonic, time
+
+from .util.crc import crc8_check, crc8_value
+from .util.files import atomic_write
 
 
 class DS28CM00(object):
@@ -14,33 +20,217 @@ class DS28CM00(object):
     """
 
     _ADDRESS = 0b1010000
+    ADDRESS_RANGE = (_ADDRESS,)
+
+    _clock = staticmethod(monotonic)
 
-    def __init__(self, smbus_ref):
+    def __init__(self, smbus_ref, retries=3, retry_budget=0.05):
         """
         Initalize object and give proper smbus to use.
 
         :param smbus_ref: smbus object, as create with smbus.Smbus(bus_number) or mock smbus object.
+        :param retries: extra reads when CRC check fails
+        :param retry_budget: seconds after first read that retries may start
         """
         self._smbus = smbus_ref
         self._serial_number = None
         self._serial_hex = None
+        self._crc = None
+        self.retries = retries
+        self.retry_budget = retry_budget
+        self._block_read = True
+
+    def _read_memory(self):
+        """
+        Reads family code, serial number and CRC.
+
+        Memory auto increments, so all 8 bytes are read with one block read transaction.  If the
+        I2C adapter does not support block reads, falls back to byte reads from address 0x00.
+
+        :return: list of 8 bytes
+        """
+        if self._block_read:
+            try:
+                return list(self._smbus.read_i2c_block_data(self._ADDRESS, 0x00, 8))
+            except (AttributeError, NotImplementedError):
+                self._block_read = False
+            except IOError as error:
+                if error.errno != errno.EOPNOTSUPP:
+                    raise
+                self._block_read = False
+        self._smbus.write_byte(self._ADDRESS, 0x00)
+        return [self._smbus.read_byte(self._ADDRESS) for _ in range(8)]
 
     @property
     def serial_number(self):
         """
         Read silicon serial number.
 
+        Transient CRC failures are retried up to `retries` times, while within `retry_budget`.
+
         :return: 48-bit serial number as hex value
         :raises: ValueError if CRC check fails
         """
-        if not self._serial_number:
-            # Load it once and cache it
-            self._smbus.write_byte(self._ADDRESS, 0x00)
-            data = [self._smbus.read_byte(self._ADDRESS) for _ in range(8)]
-            if not crc8_check(data[:-1], data[-1]):
-                raise ValueError('CRC validation failed for reading serial number.')
-            self._serial_number = 0
-            for byte_value in data[1:-1]:
-                self._serial_number = (self._serial_number << 8) + byte_value
-            self._serial_hex = hex(self._serial_number)
+        if self._serial_hex is None:
+            # Load it once and cache it.
+            self._read_serial()
         return self._serial_hex
+
+    @property
+    def crc(self):
+        """
+        CRC byte read with serial number.
+
+        :return: CRC of family code and serial number
+        :raises: ValueError if CRC check fails
+        """
+        if self._crc is None:
+            self._read_serial()
+        return self._crc
+
+    def _read_serial(self):
+        deadline = self._clock() + self.retry_budget
+        for _ in range(self.retries + 1):
+            data = self._read_memory()
+            if crc8_check(data[:-1], data[-1]):
+                break
+            if self._clock() >= deadline:
+                raise ValueError('CRC validation failed for reading serial number.')
+        else:
+            raise ValueError('CRC validation failed for reading serial number.')
+        self._serial_number = 0
+        for byte_value in data[1:-1]:
+            self._serial_number = (self._serial_number << 8) + byte_value
+        self._serial_hex = hex(self._serial_number)
+        self._crc = data[-1]
+
+
+class DS28CM00IdentityCache(object):
+    """
+    On disk cache of DS28CM00 serial numbers, keyed by bus and address.
+
+    Lets start up continue with the serial number from the last boot, without waiting on the I2C
+    read.  The device is re-read on a background thread to confirm the cached value.  A changed
+    device replaces the entry and a device failing CRC invalidates it, and callback is called with
+    what was found.  An IOError, such as a transient bus error, keeps the last good entry, and the
+    read is tried again on the next access.
+
+    Entries hold serial, CRC and the time the serial was read.  A stored CRC that does not match
+    the stored serial is treated as no entry.
+    """
+
+    _FAMILY_CODE = 0x70
+
+    def __init__(self, path, callback=None):
+        """
+        :param path: JSON file holding cache, created on first store
+        :param callback: method called with (bus_number, address, cached_serial, serial_read) when a
+                         background read does not match.  serial_read is None if the read failed.
+        """
+        self.path = path
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._threads = []
+        try:
+            with open(path) as cache_file:
+                self._entries = json.load(cache_file)
+        except (IOError, ValueError):
+            self._entries = {}
+
+    @staticmethod
+    def _key(bus_number, address):
+        return '{}:{:#04x}'.format(bus_number, address)
+
+    @classmethod
+    def _crc(cls, serial_hex):
+        return crc8_value([cls._FAMILY_CODE] + list(int(serial_hex, 16).to_bytes(6, 'big')))
+
+    def get(self, bus_number, address=DS28CM00._ADDRESS):
+        """
+        Cached entry for device.
+
+        :param bus_number: I2C bus number
+        :param address: I2C address of device
+        :return: dict with serial, crc and timestamp, or None if not cached or entry is corrupt
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(bus_number, address))
+        if entry is None:
+            return None
+        try:
+            if self._crc(entry['serial']) != entry['crc']:
+                return None
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return None
+        return dict(entry)
+
+    def store(self, bus_number, address, serial_hex, crc, timestamp=None):
+        """
+        Add or replace entry and write cache file.
+
+        :raises: ValueError if crc does not match serial_hex
+        """
+        if self._crc(serial_hex) != crc:
+            raise ValueError('CRC does not match serial number {}.'.format(serial_hex))
+        entry = {'serial': serial_hex, 'crc': crc, 'timestamp': time() if timestamp is None else timestamp}
+        with self._lock:
+            self._entries[self._key(bus_number, address)] = entry
+            self._save()
+
+    def invalidate(self, bus_number, address=DS28CM00._ADDRESS):
+        """ Remove entry for device, if present. """
+        with self._lock:
+            if self._entries.pop(self._key(bus_number, address), None) is not None:
+                self._save()
+
+    def _save(self):
+        atomic_write(self.path, json.dumps(self._entries, sort_keys=True))
+
+    def serial_number(self, bus_number, ds28cm00):
+        """
+        Serial number of device, from cache when possible.
+
+        With a cached entry, returns immediately and confirms with a background read.  Otherwise the
+        device is read now and the result stored.
+
+        :param bus_number: I2C bus number ds28cm00 is on
+        :param ds28cm00: DS28CM00 object
+        :return: 48-bit serial number as hex value
+        :raises: ValueError if not cached and CRC check fails
+        """
+        entry = self.get(bus_number, ds28cm00.ADDRESS_RANGE[0])
+        if entry is None:
+            self._read(bus_number, ds28cm00)
+            return ds28cm00.serial_number
+        thread = threading.Thread(target=self._confirm, args=(bus_number, ds28cm00, entry['serial']),
+                                  name='DS28CM00IdentityCache', daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return entry['serial']
+
+    def _read(self, bus_number, ds28cm00):
+        serial_hex = ds28cm00.serial_number
+        self.store(bus_number, ds28cm00.ADDRESS_RANGE[0], serial_hex, ds28cm00.crc)
+        return serial_hex
+
+    def _confirm(self, bus_number, ds28cm00, cached_serial):
+        address = ds28cm00.ADDRESS_RANGE[0]
+        try:
+            serial_hex = self._read(bus_number, ds28cm00)
+        except IOError:
+            # Bus error says nothing about the device, keep last good entry
+            serial_hex = None
+        except ValueError:
+            self.invalidate(bus_number, address)
+            serial_hex = None
+        if serial_hex != cached_serial and self._callback is not None:
+            self._callback(bus_number, address, cached_serial, serial_hex)
+
+    def wait(self, timeout=None):
+        """
+        Wait for background reads to finish.
+
+        :param timeout: seconds to wait for each read, None for no limit
+        """
+        while self._threads:
+            self._threads.pop(0).join(timeout)
@@ -0,0 +1,152 @@
+from collections import namedtuple
+
+EnergySummary = namedtuple('EnergySummary', 'start end samples energy_wh charge_mah '
+                                            'power_min power_max power_mean '
+                                            'current_min current_max current_mean')
+
+
+class _Window(object):
+    """ Running totals for a span of samples, constant size however many samples are added. """
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        self.samples = 0
+        self.energy_wh = 0.0
+        self.charge_mah = 0.0
+        self.power_min = self.power_max = None
+        self.current_min = self.current_max = None
+        self._power_sum = 0.0
+        self._current_sum = 0.0
+
+    def add(self, timestamp, current, power, energy_wh, charge_mah):
+        self.end = timestamp
+        self.samples += 1
+        self.energy_wh += energy_wh
+        self.charge_mah += charge_mah
+        self._power_sum += power
+        self._current_sum += current
+        if self.samples == 1:
+            self.power_min = self.power_max = power
+            self.current_min = self.current_max = current
+        else:
+            self.power_min = min(self.power_min, power)
+            self.power_max = max(self.power_max, power)
+            self.current_min = min(self.current_min, current)
+            self.current_max = max(self.current_max, current)
+
+    def summary(self):
+        power_mean = current_mean = None
+        if self.samples:
+            power_mean = self._power_sum / self.samples
+            current_mean = self._current_sum / self.samples
+        return EnergySummary(self.start, self.end, self.samples, self.energy_wh, self.charge_mah,
+                             self.power_min, self.power_max, power_mean,
+                             self.current_min, self.current_max, current_mean)
+
+
+class EnergyIntegrator(object):
+    """
+    Streaming energy (Wh) and charge (mAh) from INA219 samples.
+
+    Samples are integrated with the trapezoid rule over their real timestamps as they arrive, and
+    only running totals are kept, so memory stays constant for any length of charge.  Running min,
+    max and mean of power and current are kept for the whole run and for each decimation interval.
+
+    With interval set, an EnergySummary for each interval is returned from add and given to callback.
+    """
+
+    def __init__(self, interval=None, callback=None):
+        """
+        :param interval: seconds per decimated summary, None for whole run only
+        :param callback: method called with each interval EnergySummary
+        """
+        if interval is not None and interval <= 0:
+            raise ValueError('interval must be positive.')
+        self.interval = interval
+        self._callback = callback
+        self._total = None
+        self._window = None
+        self._previous = None
+
+    def add(self, timestamp, current, power):
+        """
+        Add a sample.
+
+        :param timestamp: seconds, increasing (time.monotonic or time.time)
+        :param current: amps
+        :param power: watts
+        :return: EnergySummary if an interval completed, otherwise None
+        """
+        energy_wh = charge_mah = 0.0
+        if self._previous is None:
+            self._total = _Window(timestamp)
+            self._window = _Window(timestamp)
+        else:
+            last_timestamp, last_current, last_power = self._previous
+            elapsed = timestamp - last_timestamp
+            if elapsed < 0:
+                raise ValueError('Sample timestamp {} is before previous sample.'.format(timestamp))
+            energy_wh = (last_power + power) / 2 * elapsed / 3600
+            charge_mah = (last_current + current) / 2 * elapsed / 3.6
+        self._previous = (timestamp, current, power)
+        self._total.add(timestamp, current, power, energy_wh, charge_mah)
+        self._window.add(timestamp, current, power, energy_wh, charge_mah)
+
+        if self.interval is None or timestamp - self._window.start < self.interval:
+            return None
+        summary = self._window.summary()
+        self._window = _Window(timestamp)
+        if self._callback is not None:
+            self._callback(summary)
+        return summary
+
+    def add_snapshot(self, timestamp, snapshot):
+        """
+        Add an INA219 PowerSnapshot taken with a calibrated INA219.
+
+        :param timestamp: seconds snapshot was taken
+        :param snapshot: PowerSnapshot
+        :return: EnergySummary if an interval completed, otherwise None
+        """
+        return self.add(timestamp, snapshot.current, snapshot.power)
+
+    def add_voltages(self, timestamp, shunt_voltage, bus_voltage, shunt_ohms):
+        """
+        Add a sample from shunt and bus voltage, such as from INA219Sampler.
+
+        :param timestamp: seconds
+        :param shunt_voltage: millivolts
+        :param bus_voltage: millivolts
+        :param shunt_ohms: shunt resistance in ohms
+        :return: EnergySummary if an interval completed, otherwise None
+        """
+        current = shunt_voltage / 1000 / shunt_ohms
+        return self.add(timestamp, current, current * bus_voltage / 1000)
+
+    def consume(self, samples):
+        """
+        Add (timestamp, current, power) samples from an iterable.
+
+        :return: list of EnergySummary for intervals completed
+        """
+        summaries = (self.add(*sample) for sample in samples)
+        return [summary for summary in summaries if summary is not None]
+
+    @property
+    def energy_wh(self):
+        return 0.0 if self._total is None else self._total.energy_wh
+
+    @property
+    def charge_mah(self):
+        return 0.0 if self._total is None else self._total.charge_mah
+
+    def summary(self):
+        """
+        Summary of the whole run so far.
+
+        :return: EnergySummary or None if no samples added
+        """
+        if self._total is None:
+            return None
+        return self._total.summary()
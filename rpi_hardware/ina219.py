@@ -1,9 +1,16 @@
 #!/usr/bin/python
 
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+
+from .util.convert import ina219_bus_word_to_millivolts, ina219_shunt_word_to_millivolts, swap_word, twos_complement
+from .util import tracing
+from .util.ring_buffer import RingBuffer
 
 
 BusVoltage = namedtuple('BusVoltage', 'voltage overflow')
+PowerSnapshot = namedtuple('PowerSnapshot', 'shunt_voltage bus_voltage current power overflow ready')
 
 
 class INA219(object):
@@ -11,6 +18,9 @@ class INA219(object):
     I2C driver for INA219 power monitor
     """
 
+    # Addresses selectable with A0 and A1 pins
+    ADDRESS_RANGE = range(0x40, 0x50)
+
     __REGISTER_CONFIG = 0x0
     __REGISTER_SHUNT = 0x1
     __REGISTER_BUS = 0x2
@@ -20,6 +30,8 @@ class INA219(object):
 
     __REG_RESET_SHIFT = 15
 
+    _clock = staticmethod(monotonic)
+
     __REG_BUS_VOLT_SHIFT = 13
 
     BUS_VOLTAGE_LOOKUP = {
@@ -57,6 +69,22 @@ class INA219(object):
         128: 0xf
     }
 
+    # Conversion time in seconds for each ADC setting.  Settings 0x4-0x7 repeat 0x0-0x3.
+    ADC_CONVERSION_TIME = {
+        0x0: 0.000084,
+        0x1: 0.000148,
+        0x2: 0.000276,
+        0x3: 0.000532,
+        0x8: 0.000532,
+        0x9: 0.00106,
+        0xa: 0.00213,
+        0xb: 0.00426,
+        0xc: 0.00851,
+        0xd: 0.01702,
+        0xe: 0.03405,
+        0xf: 0.06810
+    }
+
     __REG_MODE_POWER_DOWN = 0x0
     __REG_MODE_SHUNT_VOLTAGE_TRIGGERED = 0x1
     __REG_MODE_BUS_VOLTAGE_TRIGGERED = 0x2
@@ -66,6 +94,21 @@ class INA219(object):
     __REG_MODE_BUS_VOLTAGE_CONTINUOUS = 0x6
     __REG_MODE_SHUNT_AND_BUS_CONTINUOUS = 0x7
 
+    MODE_LOOKUP = {
+        'power_down': __REG_MODE_POWER_DOWN,
+        'shunt_triggered': __REG_MODE_SHUNT_VOLTAGE_TRIGGERED,
+        'bus_triggered': __REG_MODE_BUS_VOLTAGE_TRIGGERED,
+        'shunt_and_bus_triggered': __REG_MODE_BUS_SHUNT_AND_BUS_TRIGGERED,
+        'adc_off': __REG_MODE_ADC_OFF,
+        'shunt_continuous': __REG_MODE_SHUNT_VOLTAGE_CONTINUOUS,
+        'bus_continuous': __REG_MODE_BUS_VOLTAGE_CONTINUOUS,
+        'shunt_and_bus_continuous': __REG_MODE_SHUNT_AND_BUS_CONTINUOUS
+    }
+
+    # Bus voltage register flags
+    __BUS_CONVERSION_READY = 0x2
+    __BUS_OVERFLOW = 0x1
+
     def __init__(self, smbus_ref,
                  address=0x40,
                  bus_voltage_range=BUS_VOLTAGE_LOOKUP[32],
@@ -73,7 +116,10 @@ class INA219(object):
                  bus_adc=ADC_12BIT_SAMPLE_LOOKUP[4],
                  shunt_adc=ADC_12BIT_SAMPLE_LOOKUP[4],
                  operating_mode=__REG_MODE_BUS_SHUNT_AND_BUS_TRIGGERED,
-                 debug=False):
+                 debug=False,
+                 shunt_ohms=None,
+                 max_expected_amps=None,
+                 lazy=False):
         """
 
         :param address: I2C address 0x40-0x4f
@@ -82,11 +128,14 @@ class INA219(object):
         :param pga_gain: ADC Gain - use GAIN_LOOKUP with 1 (40mV), 2 (80mV), 4 (160mV), 8 (320mV)
         :param bus_adc: Bus ADC - use ADC_BIT_LOOKUP for single or ADC_12BIT_SAMPLE_LOOKUP for multiple sample avg.
         :param shunt_adc: Shunt ADC - use ADC_BIT_LOOKUP for single or ADC_12BIT_SAMPLE_LOOKUP for multiple sample avg.
-        :param operating_mode: Use __REG_MODE_ values for operation mode.
-        :param debug: Defaults to False
+        :param operating_mode: Operation mode - use MODE_LOOKUP with mode name.
+        :param debug: Defaults to False.  Kept for compatibility, use util.tracing to see register traffic.
+        :param shunt_ohms: Shunt resistance, give with max_expected_amps to calibrate on creation
+        :param max_expected_amps: Largest current to be measured, see calibrate
+        :param lazy: Defer configuring device until first use, see configure
         """
 
-        if not 0x40 <= address <= 0x4f:
+        if address not in self.ADDRESS_RANGE:
             raise ValueError("Invalid address.  Valid value 0x40-0x4f.")
         if not 0x0 <= bus_voltage_range <= 0x1:
             raise ValueError("Invalid bus_voltage_range.  Valid values 0-1.")
@@ -110,19 +159,52 @@ class INA219(object):
         self.shunt_adc = shunt_adc
         self.operating_mode = operating_mode
         self.debug = debug
-        self._write_config()
-        # For some reason I need to read to get things going with this guy.
-        self._read_config()
+        self.current_lsb = None
+        self.power_lsb = None
+        self._calibration = None
+        if shunt_ohms is not None and max_expected_amps is not None:
+            self._set_calibration(shunt_ohms, max_expected_amps)
+        self._configured = False
+        if not lazy:
+            self.configure()
+
+    def configure(self):
+        """
+        Makes device config and calibration match this object, writing only registers that differ.
+
+        Costs a single read when the device is already configured, such as after a service restart.
+        In a triggered operating mode config is always written, after calibration, so the first
+        reading is from a conversion started now and not one left from before.
+        Called on creation, or on first use when created with lazy=True.
+
+        :return: True if a register was written
+        """
+        written = False
+        if self._calibration is not None and \
+                self._traced_read(tracing.tracer, self.__REGISTER_CALIBRATION) != self._calibration:
+            self._write_register(self.__REGISTER_CALIBRATION, self._calibration)
+            written = True
+        # Reading first also gets things going with this guy.
+        if self._is_triggered_mode() or self._read_config() != self._build_config():
+            self._write_config()
+            written = True
+        self._configured = True
+        return written
+
+    def _is_triggered_mode(self):
+        return self.__REG_MODE_SHUNT_VOLTAGE_TRIGGERED <= self.operating_mode \
+            <= self.__REG_MODE_BUS_SHUNT_AND_BUS_TRIGGERED
+
+    def _ensure_configured(self):
+        if not self._configured:
+            self.configure()
 
     def _write_config(self):
         """
         Writes current values to config register
         :return: None
         """
-        config = self._build_config()
-        if self.debug:
-            print("Config: %s " % bin(config))
-        self._smbus.write_word_data(self.address, self.__REGISTER_CONFIG, config)
+        self._write_register(self.__REGISTER_CONFIG, self._build_config())
 
     def _build_config(self):
         """
@@ -138,9 +220,34 @@ class INA219(object):
         config_value |= self.operating_mode
         return config_value
 
+    def _read_register(self, register):
+        # SMBus words arrive low byte first, the INA219 sends MSB first
+        return swap_word(self._smbus.read_word_data(self.address, register))
+
+    def _traced_read(self, tracer, register, decode=None):
+        """
+        Read register, recording it with tracer when tracing.
+
+        :param tracer: tracing.tracer, looked up once by the caller
+        :param decode: gives the traced value from the register value, defaults to the register value
+        :return: register value
+        """
+        if tracer is None:
+            return self._read_register(register)
+        start = tracer.clock()
+        value = self._read_register(register)
+        tracer.record('INA219', self.address, register, value, value if decode is None else decode(value), start)
+        return value
+
+    def _write_register(self, register, value):
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        self._smbus.write_word_data(self.address, register, swap_word(value))
+        if tracer:
+            tracer.record('INA219', self.address, register, value, None, start)
+
     def _read_config(self):
-        config_value = self._smbus.read_word_data(self.address, self.__REGISTER_CONFIG)
-        return config_value
+        return self._traced_read(tracing.tracer, self.__REGISTER_CONFIG)
 
     def shunt_voltage(self):
         """
@@ -148,46 +255,196 @@ class INA219(object):
 
         :return: shunt voltage in millivolts
         """
-        value = self._smbus.read_word_data(self.address, self.__REGISTER_SHUNT)
-        print('value', value)
-        # Get sign from top bit
-        sign = value & 0x8000
-        print('sign', sign)
-        # Make bit resolution based sign clearing mask
-        sign_clear_mask = 0x7fff >> 12 - self._shunt_bit_resolution()
-        print('sign_clear_mask', sign_clear_mask)
-        # Clear out sign bits
-        value &= sign_clear_mask
-        print(value)
-        # Convert to mV and apply sign
-        if sign:
-            return value / -100
-        return value / 100
+        self._ensure_configured()
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        value = self._read_register(self.__REGISTER_SHUNT)
+        # Sign is extended through upper bits, so value is 16 bit two's complement of 10uV steps
+        voltage = ina219_shunt_word_to_millivolts(value)
+        if tracer:
+            tracer.record('INA219', self.address, self.__REGISTER_SHUNT, value, voltage, start)
+        return voltage
 
     def bus_voltage(self):
         """
         Gets the bus voltage
         :return: bus voltage in millivolts
         """
-        value = self._smbus.read_word_data(self.address, self.__REGISTER_BUS)
-        print('value', value)
-        # shift voltage down to 1
-        voltage = (value & 0xfff8) >> 3
-        print('voltage', voltage)
-        # convert into mV
-        voltage /= 4
-        print('voltage', voltage)
-        overflow = (value & 1)
-        print('overflow', overflow)
-        return BusVoltage(voltage, overflow)
+        self._ensure_configured()
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        value = self._read_register(self.__REGISTER_BUS)
+        # shift voltage down and convert 4mV steps into mV
+        bus_voltage = BusVoltage(ina219_bus_word_to_millivolts(value), value & self.__BUS_OVERFLOW)
+        if tracer:
+            tracer.record('INA219', self.address, self.__REGISTER_BUS, value, bus_voltage, start)
+        return bus_voltage
+
+    def set_operating_mode(self, operating_mode):
+        """
+        Change operating mode and write config.
+
+        :param operating_mode: use MODE_LOOKUP with mode name
+        :return: None
+        """
+        self._ensure_configured()
+        if not 0x0 <= operating_mode <= 0x7:
+            raise ValueError("Invalid operating_mode.  Valid values 0x0-0x7.")
+        self.operating_mode = operating_mode
+        self._write_config()
+
+    def conversion_time(self):
+        """
+        Time for one conversion with current ADC settings and operating mode.
+
+        :return: seconds, 0 when ADC is off or powered down
+        """
+        mode = self.operating_mode & 0x3
+        conversion_time = 0
+        if mode & self.__REG_MODE_SHUNT_VOLTAGE_TRIGGERED:
+            conversion_time += self._adc_conversion_time(self.shunt_adc)
+        if mode & self.__REG_MODE_BUS_VOLTAGE_TRIGGERED:
+            conversion_time += self._adc_conversion_time(self.bus_adc)
+        return conversion_time
+
+    def _adc_conversion_time(self, adc_setting):
+        if adc_setting < 0x8:
+            adc_setting &= 0x3
+        return self.ADC_CONVERSION_TIME[adc_setting]
+
+    def trigger(self):
+        """
+        Start a conversion in a triggered operating mode, by writing config.
+
+        :return: clock time (time.monotonic) when conversion will be complete
+        :raises: ValueError if operating mode is not triggered
+        """
+        self._ensure_configured()
+        if not self._is_triggered_mode():
+            raise ValueError("trigger requires a triggered operating_mode.")
+        self._write_config()
+        return INA219._clock() + self.conversion_time()
+
+    def read_conversion(self):
+        """
+        Reads shunt and bus voltage only if a conversion completed since the last one read.
+
+        Bus voltage register is read first for its conversion ready (CNVR) flag.  If set, shunt
+        voltage is read, then power register, which clears CNVR for the next conversion.
+
+        :return: (shunt voltage in millivolts, BusVoltage) or None if no new conversion
+        """
+        self._ensure_configured()
+        tracer = tracing.tracer
+        bus_value = self._traced_read(tracer, self.__REGISTER_BUS, ina219_bus_word_to_millivolts)
+        if not bus_value & self.__BUS_CONVERSION_READY:
+            return None
+        shunt_value = self._traced_read(tracer, self.__REGISTER_SHUNT, ina219_shunt_word_to_millivolts)
+        self._traced_read(tracer, self.__REGISTER_POWER)
+        return (ina219_shunt_word_to_millivolts(shunt_value),
+                BusVoltage(ina219_bus_word_to_millivolts(bus_value), bus_value & self.__BUS_OVERFLOW))
+
+    def snapshot(self, retries=2):
+        """
+        Reads all four result registers as one consistent sample.
+
+        Conversion ready (CNVR) in the bus voltage register shows if the registers are from one
+        conversion.  Bus voltage is read for CNVR, then power, which clears it, then shunt voltage,
+        current and bus voltage again.  Power holds the latest conversion when read, so if CNVR is
+        still clear on the second bus voltage read no conversion finished part way through.
+        Otherwise the read is retried.  This works without calibration too.
+
+        :param retries: extra attempts when a conversion finishes during the read
+        :return: PowerSnapshot, ready is True if a new conversion completed since last power read
+        :raises: IOError if conversions keep finishing during the read
+        """
+        self._ensure_configured()
+        tracer = tracing.tracer
+        bus_value = self._traced_read(tracer, self.__REGISTER_BUS, ina219_bus_word_to_millivolts)
+        ready = bool(bus_value & self.__BUS_CONVERSION_READY)
+        for _ in range(retries + 1):
+            power_value = self._traced_read(tracer, self.__REGISTER_POWER)
+            shunt_value = self._traced_read(tracer, self.__REGISTER_SHUNT, ina219_shunt_word_to_millivolts)
+            current_value = self._traced_read(tracer, self.__REGISTER_CURRENT)
+            bus_value = self._traced_read(tracer, self.__REGISTER_BUS, ina219_bus_word_to_millivolts)
+            if not bus_value & self.__BUS_CONVERSION_READY:
+                break
+            ready = True
+        else:
+            raise IOError('INA219 registers changed during snapshot.')
+        if self.current_lsb is not None:
+            current_value = twos_complement(current_value) * self.current_lsb
+            power_value *= self.power_lsb
+        return PowerSnapshot(ina219_shunt_word_to_millivolts(shunt_value),
+                             ina219_bus_word_to_millivolts(bus_value),
+                             current_value,
+                             power_value,
+                             bus_value & self.__BUS_OVERFLOW,
+                             ready)
+
+    def calibrate(self, shunt_ohms, max_expected_amps):
+        """
+        Writes calibration register, so the chip calculates current and power registers.
+
+        Current LSB is the smallest step covering max_expected_amps with 15 bits.  Calibration
+        value is truncated as in the datasheet, so the LSBs are worked back from the value written.
+
+        :param shunt_ohms: Shunt resistance in ohms
+        :param max_expected_amps: Largest current to be measured in amps
+        :return: calibration register value written
+        """
+        calibration = self._set_calibration(shunt_ohms, max_expected_amps)
+        self._write_register(self.__REGISTER_CALIBRATION, calibration)
+        return calibration
+
+    def _set_calibration(self, shunt_ohms, max_expected_amps):
+        """
+        Works out calibration register value and LSBs, without writing to the device.
+
+        :return: calibration register value
+        """
+        if shunt_ohms <= 0 or max_expected_amps <= 0:
+            raise ValueError("shunt_ohms and max_expected_amps must be positive.")
+        calibration = int(0.04096 / (max_expected_amps / 32768 * shunt_ohms))
+        if not 2 <= calibration <= 0xffff:
+            raise ValueError("Calibration value {} out of range.  Check shunt_ohms and "
+                             "max_expected_amps.".format(calibration))
+        # Bit 0 is not used
+        calibration &= 0xfffe
+        self._calibration = calibration
+        self.current_lsb = 0.04096 / (calibration * shunt_ohms)
+        self.power_lsb = 20 * self.current_lsb
+        return calibration
 
     def power(self):
-        value = self._smbus.read_word_data(self.address, self.__REGISTER_POWER)
-        return value
+        """
+        Gets power, calculated by the chip from current and bus voltage
+
+        :return: watts once calibrated, otherwise raw register value
+        """
+        self._ensure_configured()
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        value = self._read_register(self.__REGISTER_POWER)
+        power = value if self.power_lsb is None else value * self.power_lsb
+        if tracer:
+            tracer.record('INA219', self.address, self.__REGISTER_POWER, value, power, start)
+        return power
 
     def current(self):
-        value = self._smbus.read_word_data(self.address, self.__REGISTER_CURRENT)
-        return value
+        """
+        Gets current, calculated by the chip from shunt voltage
+
+        :return: amps once calibrated, otherwise raw register value
+        """
+        self._ensure_configured()
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        value = self._read_register(self.__REGISTER_CURRENT)
+        current = value if self.current_lsb is None else twos_complement(value) * self.current_lsb
+        if tracer:
+            tracer.record('INA219', self.address, self.__REGISTER_CURRENT, value, current, start)
+        return current
 
     def _shunt_bit_resolution(self):
         return self._bit_resolution(self.shunt_adc)
@@ -200,3 +457,126 @@ class INA219(object):
         if bit_setting > 0x3:
             return 12
         return (9, 10, 11, 12)[bit_setting]
+
+
+def configure_all(devices, max_workers=None):
+    """
+    Configure a fleet of INA219 created with lazy=True, one thread per bus.
+
+    Devices on the same bus are configured one after another, as the bus is shared.
+
+    :param devices: iterable of INA219 objects
+    :param max_workers: thread limit, defaults to one per bus
+    :return: list of True where a register was written, in order of devices
+    """
+    devices = list(devices)
+    buses = OrderedDict()
+    for index, device in enumerate(devices):
+        buses.setdefault(id(device._smbus), []).append(index)
+    if not buses:
+        return []
+    written = [False] * len(devices)
+
+    def configure_bus(indexes):
+        for index in indexes:
+            written[index] = devices[index].configure()
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(buses)) as executor:
+        # list() to raise any exception from a thread
+        list(executor.map(configure_bus, buses.values()))
+    return written
+
+
+def triggered_snapshot_all(devices, retries=3):
+    """
+    Triggered conversion and snapshot for a fleet of INA219, which may be on several buses.
+
+    Every device is triggered first, then each is read as its conversion completes, in order of
+    completion time worked out from its ADC settings.  A cycle takes about the longest single
+    conversion rather than the sum of them.  A device not showing conversion ready when read is
+    given another tenth of its conversion time, up to retries times.
+
+    :param devices: iterable of INA219 objects in a triggered operating mode
+    :param retries: extra reads for a device whose conversion is not ready yet
+    :return: list of PowerSnapshot, in order of devices
+    """
+    devices = list(devices)
+    ready_times = [device.trigger() for device in devices]
+    snapshots = [None] * len(devices)
+    for index in sorted(range(len(devices)), key=ready_times.__getitem__):
+        device = devices[index]
+        remaining = ready_times[index] - INA219._clock()
+        if remaining > 0:
+            sleep(remaining)
+        snapshot = device.snapshot()
+        for _ in range(retries):
+            if snapshot.ready:
+                break
+            sleep(device.conversion_time() / 10)
+            snapshot = device.snapshot()
+        snapshots[index] = snapshot
+    return snapshots
+
+
+class INA219Sampler(object):
+    """
+    Continuous mode sampling of an INA219 into a preallocated ring buffer.
+
+    The chip is polled for its conversion ready flag and registers are only read when a new
+    conversion is available, so no sample is stored twice.  Samples are recorded with a
+    time.monotonic timestamp in `buffer`, fields: timestamp, shunt_voltage, bus_voltage, overflow.
+    """
+
+    _clock = staticmethod(monotonic)
+
+    def __init__(self, ina219, capacity=4096):
+        """
+        :param ina219: INA219 object
+        :param capacity: number of samples held before oldest is overwritten
+        """
+        self._ina219 = ina219
+        self.buffer = RingBuffer(capacity, (('timestamp', 'd'),
+                                            ('shunt_voltage', 'd'),
+                                            ('bus_voltage', 'd'),
+                                            ('overflow', 'B')))
+        self.polls = 0
+
+    def start(self):
+        """ Put INA219 in continuous shunt and bus conversion mode. """
+        self._ina219.set_operating_mode(INA219.MODE_LOOKUP['shunt_and_bus_continuous'])
+
+    def poll(self):
+        """
+        Store a sample if a new conversion is ready.
+
+        :return: True if a sample was stored
+        """
+        self.polls += 1
+        conversion = self._ina219.read_conversion()
+        if conversion is None:
+            return False
+        shunt_voltage, bus_voltage = conversion
+        self.buffer.append(self._clock(), shunt_voltage, bus_voltage.voltage, bus_voltage.overflow)
+        return True
+
+    def run(self, count=None, duration=None, poll_interval=0):
+        """
+        Poll until count samples are stored or duration has passed.
+
+        :param count: number of samples to store
+        :param duration: seconds to run
+        :param poll_interval: seconds to sleep between polls without a new sample, 0 to spin
+        :return: number of samples stored
+        """
+        if count is None and duration is None:
+            raise ValueError('count or duration is required.')
+        end_time = None if duration is None else self._clock() + duration
+        stored = 0
+        while count is None or stored < count:
+            if end_time is not None and self._clock() >= end_time:
+                break
+            if self.poll():
+                stored += 1
+            elif poll_interval:
+                sleep(poll_interval)
+        return stored
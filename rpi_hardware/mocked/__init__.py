@@ -1,3 +1,6 @@
 from .gpio import GPIO
 from .ds28cm00 import FakeDS28CM00
 from .hcf4094 import HCF4094Capture
+from .tmp275 import FakeTMP275
+from .ina219 import FakeINA219
+from .replay import ReplaySMBus, ReplayGPIO
@@ -8,7 +8,9 @@ class FakeDS28CM00(FakeSMBusDevice):
     Fake Hardware for DS28CM00, to be talked to using DS28CM00 object for testing and simulation
 
     DS28CM00 is a silicon serial number.  So we just have a simple memory device that
-    is read with multiple byte calls.
+    is read with multiple byte calls or a block read.
+
+    inject_bit_errors corrupts the data of following read transactions, to test CRC handling.
 
     Note: Only implemented write for address selection.  Not for writing of the one
     configuration bit, which would occur with a write of 0x08 followed by 0x00 or 0x01.
@@ -33,8 +35,23 @@ class FakeDS28CM00(FakeSMBusDevice):
         self._data = data + [crc8_value(data)] + [0x01]
         self._write_map = [False] * 8 + [True]
         self._index = 0
+        self._bit_errors = 0
         super().__init__(smbus, self._ADDRESS)
 
+    def inject_bit_errors(self, count):
+        """
+        Flip a bit in the first byte returned by each of the next count read transactions.
+
+        :param count: number of read transactions to corrupt
+        """
+        self._bit_errors = count
+
+    def _transmit(self, data):
+        if self._bit_errors:
+            self._bit_errors -= 1
+            data[0] ^= 0x01
+        return data
+
     def _inc_index(self):
         self._index += 1
         if self._index > 8:
@@ -46,7 +63,20 @@ class FakeDS28CM00(FakeSMBusDevice):
         else:
             raise ValueError('Valid memory addresses for write at 0x00 to 0x08.')
 
-    def read_byte(self):
+    def _next_byte(self):
         value = self._data[self._index]
         self._inc_index()
         return value
+
+    def read_byte(self):
+        return self._transmit([self._next_byte()])[0]
+
+    def read_i2c_block_data(self, register, length):
+        self.write_byte(register)
+        return self.i2c_read(length)
+
+    def i2c_write(self, byte_list):
+        self.write_byte(byte_list[0])
+
+    def i2c_read(self, length):
+        return self._transmit([self._next_byte() for _ in range(length)])
@@ -76,6 +76,8 @@ class FakeGPIO(Singleton):
         for pin in self._board_to_bcm.values():
             self._pins[pin] = [self.IN, self.LOW]
         self._edge_callback = defaultdict(list)
+        # Callbacks from add_event_detect, kept apart so remove_event_detect leaves add_event_callback ones
+        self._detect_callback = {}
         self._show_warnings = True
 
     def _pin_is_input(self, pin_number):
@@ -95,14 +97,30 @@ class FakeGPIO(Singleton):
         self._validate_edge_type(edge_type)
         self._edge_callback[pin].append((edge_type, callback))
 
-    def add_event_detect(self):
-        raise NotImplementedError
+    def add_event_detect(self, pin_number, edge_type, callback=None, bouncetime=None):
+        """
+        Edge detection as RPi.GPIO does it, callback is called with the pin number.
+
+        Unlike add_event_callback, BOTH is allowed.  bouncetime is accepted and ignored.
+        """
+        pin = self._translate_pin(pin_number)
+        if edge_type == self.BOTH:
+            edge_types = (self.RISING, self.FALLING)
+        else:
+            self._validate_edge_type(edge_type)
+            edge_types = (edge_type,)
+        detected = self._detect_callback.setdefault(pin, [])
+        if callback is not None:
+            for edge in edge_types:
+                detected.append((edge, lambda: callback(pin_number)))
 
     def event_detected(self):
         raise NotImplementedError
 
-    def remove_event_detect(self):
-        raise NotImplementedError
+    def remove_event_detect(self, pin_number):
+        """ Remove edge detection added with add_event_detect.  Like RPi.GPIO, nothing to remove is not an error. """
+        pin = self._translate_pin(pin_number)
+        self._detect_callback.pop(pin, None)
 
     def getmode(self):
         return self._mode
@@ -136,7 +154,7 @@ class FakeGPIO(Singleton):
             edge_type = self.RISING
 
         # Perform edge callback
-        for callpair in self._edge_callback[pin]:
+        for callpair in self._edge_callback[pin] + self._detect_callback.get(pin, []):
             if callpair[0] == edge_type:
                 callpair[1]()
 
@@ -189,13 +207,18 @@ class FakeGPIO(Singleton):
             raise ValueError('mode should be BCM or BOARD.')
         self._mode = pin_numbering_style
 
-    def setup(self, pin_number, direction, initial=None):
+    def setup(self, pin_number, direction, initial=None, pull_up_down=None):
         pin = self._translate_pin(pin_number)
         if direction not in (self.IN, self.OUT):
             raise ValueError('direction should be IN or OUT.')
+        if pull_up_down not in (None, self.PUD_OFF, self.PUD_UP, self.PUD_DOWN):
+            raise ValueError('pull_up_down should be PUD_OFF, PUD_UP or PUD_DOWN.')
         self._pins[pin][0] = direction
         if initial:
             self._pins[pin][1] = initial
+        if direction == self.IN and pull_up_down in (self.PUD_UP, self.PUD_DOWN):
+            # Input floats to the pull resistor level
+            self._pins[pin][1] = (self.LOW, self.HIGH)[pull_up_down == self.PUD_UP]
 
     def wait_for_edge(self, edge_type):
         # Hard to simulate this, as it is blocking.
@@ -0,0 +1,120 @@
+from .smbus import FakeSMBusDevice
+from rpi_hardware import INA219
+from rpi_hardware.util.convert import swap_word
+
+
+class FakeINA219(FakeSMBusDevice):
+    """
+    Fake Hardware for INA219, to be talked to using INA219 object for testing and simulation
+
+    Call `set_measurement` with shunt and bus voltages to simulate a completed conversion.
+    Writing config in a triggered mode converts the last measurement again, immediately.
+    Current and power registers are calculated from the calibration register as the chip does.
+    Word reads and writes are low byte first, as smbus read_word_data and write_word_data are on a
+    real bus, while the chip itself sends registers MSB first.
+    """
+
+    _REGISTER_CONFIG = 0x0
+    _REGISTER_SHUNT = 0x1
+    _REGISTER_BUS = 0x2
+    _REGISTER_POWER = 0x3
+    _REGISTER_CURRENT = 0x4
+    _REGISTER_CALIBRATION = 0x5
+
+    _CONFIG_POWER_ON = 0x399f
+    _CONFIG_RESET = 0x8000
+
+    _BUS_CONVERSION_READY = 0x2
+    _BUS_OVERFLOW = 0x1
+
+    def __init__(self, smbus, address=0x40):
+        """
+        Initalize object and attach to smbus.
+
+        :param smbus: mock smbus object.
+        :param address: I2C Address of Chip 0x40-0x4f
+        """
+        if address not in INA219.ADDRESS_RANGE:
+            raise ValueError("Invalid address.  Valid value 0x40-0x4f.")
+        self._reset()
+        super().__init__(smbus, address)
+
+    def _reset(self):
+        self._registers = dict.fromkeys(range(6), 0)
+        self._registers[self._REGISTER_CONFIG] = self._CONFIG_POWER_ON
+        self._shunt_millivolts = 0.0
+        self._bus_millivolts = 0.0
+
+    @staticmethod
+    def _twos_complement(value):
+        return int(value) & 0xffff
+
+    def set_measurement(self, shunt_millivolts, bus_millivolts, overflow=False):
+        """
+        Simulate a completed conversion.
+
+        :param shunt_millivolts: voltage across shunt, 10uV resolution
+        :param bus_millivolts: bus voltage, 4mV resolution
+        :param overflow: set math overflow flag
+        """
+        self._shunt_millivolts = shunt_millivolts
+        self._bus_millivolts = bus_millivolts
+        shunt = self._twos_complement(round(shunt_millivolts * 100))
+        bus = (int(round(bus_millivolts / 4)) << 3) & 0xfff8
+        bus |= self._BUS_CONVERSION_READY
+        if overflow:
+            bus |= self._BUS_OVERFLOW
+        self._registers[self._REGISTER_SHUNT] = shunt
+        self._registers[self._REGISTER_BUS] = bus
+        self._calculate()
+
+    def _calculate(self):
+        """ Current and power registers, from datasheet equations. """
+        calibration = self._registers[self._REGISTER_CALIBRATION]
+        shunt = self._registers[self._REGISTER_SHUNT]
+        if shunt & 0x8000:
+            shunt -= 0x10000
+        current = int(shunt * calibration / 4096)
+        power = int(abs(current) * (self._registers[self._REGISTER_BUS] >> 3) / 5000)
+        self._registers[self._REGISTER_CURRENT] = self._twos_complement(current)
+        self._registers[self._REGISTER_POWER] = power & 0xffff
+
+    def _read_register(self, register):
+        if register not in self._registers:
+            raise ValueError('Valid registers are 0x00 to 0x05.')
+        value = self._registers[register]
+        if register == self._REGISTER_POWER:
+            # Reading power clears conversion ready
+            self._registers[self._REGISTER_BUS] &= ~self._BUS_CONVERSION_READY
+        return value
+
+    def read_word_data(self, register):
+        # SMBus words are low byte first, chip sends MSB first
+        return swap_word(self._read_register(register))
+
+    def read_i2c_block_data(self, register, length):
+        # Bytes on the wire are MSB first, reads past the register repeat the last byte
+        value = self._read_register(register)
+        data = [value >> 8, value & 0xff]
+        return (data + [data[-1]] * length)[:length]
+
+    def write_word_data(self, register, value):
+        value = swap_word(value)
+        if register == self._REGISTER_CONFIG:
+            if value & self._CONFIG_RESET:
+                self._reset()
+                return
+            self._registers[self._REGISTER_BUS] &= ~self._BUS_CONVERSION_READY
+            if 0x1 <= value & 0x7 <= 0x3:
+                # Triggered mode, convert last measurement
+                self._registers[register] = value
+                self.set_measurement(self._shunt_millivolts, self._bus_millivolts)
+                return
+        elif register == self._REGISTER_CALIBRATION:
+            # Bit 0 is not used and always 0
+            value &= 0xfffe
+        else:
+            raise ValueError('Only config and calibration registers are writable.')
+        self._registers[register] = value & 0xffff
+        if register == self._REGISTER_CALIBRATION:
+            self._calculate()
@@ -0,0 +1,173 @@
+import os
+from time import monotonic, sleep
+
+from rpi_hardware.util.metrics import SMBUS_TRANSACTIONS
+from rpi_hardware.util.recorder import RESULTS, decode_value, gpio_written, read_log, smbus_written
+from .gpio import FakeGPIO
+# i2c_msg is found here by util.i2c.i2c_msg_type, so drivers use i2c_rdwr with ReplaySMBus
+from .smbus import i2c_msg
+
+
+class ReplayMismatch(ValueError):
+    """ Traffic being replayed differs from what was recorded. """
+
+
+class _Replay(object):
+    """ Serves recorded transactions of one channel, in order, read from the log as they are needed. """
+
+    _clock = staticmethod(monotonic)
+
+    def __init__(self, path, channel, operations, realtime, strict):
+        self._records = (record for record in read_log(path)
+                         if record.channel == channel and record.operation in operations)
+        # Next record is read ahead, which also checks the log when replay is created
+        self._next = next(self._records, None)
+        self.realtime = realtime
+        self.strict = strict
+        self._offset = None
+
+    @property
+    def finished(self):
+        """ True once every recorded transaction has been replayed. """
+        return self._next is None
+
+    def close(self):
+        """ Close log, no further transactions are replayed. """
+        self._records.close()
+        self._next = None
+
+    def _wait(self, timestamp):
+        if self._offset is None:
+            self._offset = self._clock() - timestamp
+        remaining = self._offset + timestamp - self._clock()
+        if remaining > 0:
+            sleep(remaining)
+
+    def _replay(self, name, address, register, written):
+        """
+        Take next recorded transaction, checking it is the one being made.
+
+        :return: bytes read in recorded transaction
+        :raises: ReplayMismatch if transaction differs, IOError if recorded transaction failed
+        """
+        if self._next is None:
+            raise ReplayMismatch('Recorded traffic finished, {} to {} not recorded.'.format(name, address))
+        record = self._next
+        if (record.operation, record.address, record.register) != (name, address, register):
+            raise ReplayMismatch('Recorded {} to {} register {}, not {} to {} register {}.'.format(
+                record.operation, record.address, record.register, name, address, register))
+        if self.strict and record.written != written:
+            raise ReplayMismatch('Recorded {} to {} wrote {}, not {}.'.format(
+                name, address, list(record.written), list(written)))
+        self._next = next(self._records, None)
+        if self.realtime:
+            self._wait(record.timestamp)
+        if record.errno:
+            raise IOError(record.errno, os.strerror(record.errno))
+        return record.read
+
+
+class ReplaySMBus(_Replay):
+    """
+    Replays SMBus traffic recorded with util.recorder.TrafficRecorder, in place of mocked.smbus.SMBus.
+
+    Each transaction returns what the device returned when recorded, or raises the IOError it raised.
+    Transactions must be made in recorded order.  With strict, the bytes written must match too.
+
+    By default transactions return as fast as possible.  With realtime, each waits until its time
+    in the recording, measured from the first transaction.
+    """
+
+    def __init__(self, path, channel=0, realtime=False, strict=True):
+        """
+        :param path: log written by TrafficRecorder
+        :param channel: channel of bus in log
+        :param realtime: replay at recorded timing
+        :param strict: check bytes written match recording
+        """
+        super().__init__(path, channel, set(SMBUS_TRANSACTIONS) | {'i2c_rdwr'}, realtime, strict)
+        for name, (has_register, _) in SMBUS_TRANSACTIONS.items():
+            setattr(self, name, self._replayed(name, has_register))
+
+    def _replayed(self, name, has_register):
+        kind = RESULTS.get(name)
+
+        def _transaction(address, *args):
+            register = args[0] if has_register else None
+            read = self._replay(name, address, register, smbus_written(name, (address,) + args))
+            if kind is not None:
+                return decode_value(read, kind)
+        return _transaction
+
+    def i2c_rdwr(self, *msgs):
+        address = msgs[0].addr if msgs else 0
+        written = b''.join(bytes(msg) for msg in msgs if not msg.flags & 1)
+        read = self._replay('i2c_rdwr', address, None, written)
+        position = 0
+        for msg in msgs:
+            if msg.flags & 1:
+                msg.buf[:] = read[position:position + len(msg)]
+                position += len(msg)
+
+
+class ReplayGPIO(_Replay):
+    """
+    Replays GPIO setup, output and input recorded with util.recorder.TrafficRecorder, in place of mocked GPIO.
+
+    input returns the recorded pin value.  Other methods, such as setmode, are accepted and ignored.
+    See ReplaySMBus for realtime and strict.
+    """
+
+    BCM = FakeGPIO.BCM
+    BOARD = FakeGPIO.BOARD
+    BOTH = FakeGPIO.BOTH
+    FALLING = FakeGPIO.FALLING
+    RISING = FakeGPIO.RISING
+    HIGH = FakeGPIO.HIGH
+    LOW = FakeGPIO.LOW
+    IN = FakeGPIO.IN
+    OUT = FakeGPIO.OUT
+    PUD_DOWN = FakeGPIO.PUD_DOWN
+    PUD_OFF = FakeGPIO.PUD_OFF
+    PUD_UP = FakeGPIO.PUD_UP
+    UNKNOWN = FakeGPIO.UNKNOWN
+
+    def __init__(self, path, channel=0, realtime=False, strict=True):
+        """
+        :param path: log written by TrafficRecorder
+        :param channel: channel of GPIO in log
+        :param realtime: replay at recorded timing
+        :param strict: check values written match recording
+        """
+        super().__init__(path, channel, {'setup', 'output', 'input'}, realtime, strict)
+        self._mode = self.UNKNOWN
+
+    def setup(self, pin_number, *args, **kwargs):
+        self._replay('setup', pin_number, None, gpio_written('setup', (pin_number,) + args, kwargs))
+
+    def output(self, pin_number, value):
+        self._replay('output', pin_number, None, gpio_written('output', (pin_number, value), {}))
+
+    def input(self, pin_number):
+        return self._replay('input', pin_number, None, b'')[0]
+
+    def setmode(self, pin_numbering_style):
+        self._mode = pin_numbering_style
+
+    def getmode(self):
+        return self._mode
+
+    def setwarnings(self, show_warnings):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def add_event_callback(self, pin_number, edge_type, callback):
+        pass
+
+    def add_event_detect(self, pin_number, edge_type, callback=None, bouncetime=None):
+        pass
+
+    def remove_event_detect(self, pin_number):
+        pass
@@ -1,3 +1,47 @@
+import errno
+
+I2C_M_RD = 0x0001
+
+
+class i2c_msg(object):
+    """
+    Mirrors smbus2.i2c_msg, so combined transactions can be simulated with SMBus.i2c_rdwr.
+
+    Use i2c_msg.write(addr, buf) and i2c_msg.read(addr, length) to create messages.
+    Iterating a read message after i2c_rdwr gives the bytes the device returned.
+    """
+
+    def __init__(self, addr, flags, buf):
+        self.addr = addr
+        self.flags = flags
+        self.buf = bytearray(buf)
+
+    @property
+    def len(self):
+        return len(self.buf)
+
+    @staticmethod
+    def read(address, length):
+        return i2c_msg(address, I2C_M_RD, [0] * length)
+
+    @staticmethod
+    def write(address, buf):
+        if isinstance(buf, str):
+            buf = buf.encode()
+        return i2c_msg(address, 0, buf)
+
+    def __iter__(self):
+        return iter(self.buf)
+
+    def __len__(self):
+        return len(self.buf)
+
+    def __bytes__(self):
+        return bytes(self.buf)
+
+    def __repr__(self):
+        return 'i2c_msg({}, {}, {})'.format(self.addr, self.flags, list(self.buf))
+
 
 class SMBus(object):
     """
@@ -44,25 +88,38 @@ class SMBus(object):
         except KeyError:
             return None
 
+    def _ack_device(self, smbus_addr):
+        """
+        Returns device object for a transaction at given smbus address
+
+        :param smbus_addr: Address for device
+        :return: FakeSMBusDevice object
+        :raises: IOError like smbus, if no device acknowledges the address
+        """
+        device = self._get_device(smbus_addr)
+        if device is None:
+            raise IOError(errno.EREMOTEIO, 'Remote I/O error')
+        return device
+
     def write_quick(self, smbus_addr):
         """ Send only the read / write bit as write. """
-        self._get_device(smbus_addr).write_quick()
+        self._ack_device(smbus_addr).write_quick()
 
     def read_byte(self, smbus_addr):
         """ Read a single byte from a device, without specifying a device register. """
-        return self._get_device(smbus_addr).read_byte()
+        return self._ack_device(smbus_addr).read_byte()
 
     def write_byte(self, smbus_addr, byte):
         """ Send a single byte to a device. """
-        self._get_device(smbus_addr).write_byte(byte)
+        self._ack_device(smbus_addr).write_byte(byte)
 
     def process_call(self, smbus_addr, register, value):
         """ Process Call transaction. """
-        self._get_device(smbus_addr).process_call(register, value)
+        self._ack_device(smbus_addr).process_call(register, value)
 
     def read_block_data(self, smbus_addr, register):
         """ Read Block Data transaction. """
-        return self._get_device(smbus_addr).read_block_data(register)
+        return self._ack_device(smbus_addr).read_block_data(register)
 
     def write_block_data(self, smbus_addr, register, value_list):
         """
@@ -72,35 +129,54 @@ class SMBus(object):
 
         Use write_i2c_block_data instead!
         """
-        self._get_device(smbus_addr).write_block_data(register, value_list)
+        self._ack_device(smbus_addr).write_block_data(register, value_list)
 
     def block_process_call(self, smbus_addr, register, value_list):
         """ Block Process Call transaction. """
-        self._get_device(smbus_addr).block_process_call(register, value_list)
+        self._ack_device(smbus_addr).block_process_call(register, value_list)
 
-    def read_i2c_block_data(self, smbus_addr, register):
-        """ Block Read transaction. """
-        return self._get_device(smbus_addr).read_i2c_block_data(register)
+    def read_i2c_block_data(self, smbus_addr, register, length=32):
+        """
+        Block Read transaction.
+
+        Register write followed by repeated start read of `length` bytes, in a single transaction.
+        """
+        if not 0 < length <= 32:
+            raise ValueError('length must be 1 to 32 bytes.')
+        return list(self._ack_device(smbus_addr).read_i2c_block_data(register, length))
 
     def write_i2c_block_data(self, smbus_addr, register, value_list):
         """ Block Write transaction. """
-        self._get_device(smbus_addr).write_i2c_block_data(register, value_list)
+        self._ack_device(smbus_addr).write_i2c_block_data(register, value_list)
 
     def read_byte_data(self, smbus_addr, register):
         """ Read Byte Data transaction. """
-        return self._get_device(smbus_addr).read_byte(register)
+        return self._ack_device(smbus_addr).read_byte_data(register)
 
     def read_word_data(self, smbus_addr, register):
         """ Read Word Data transaction. """
-        return self._get_device(smbus_addr).read_word(register)
+        return self._ack_device(smbus_addr).read_word_data(register)
 
     def write_byte_data(self, smbus_addr, register, value):
         """ Write Byte Data transaction. """
-        self._get_device(smbus_addr).write_byte(register, value)
+        self._ack_device(smbus_addr).write_byte_data(register, value)
 
     def write_word_data(self, smbus_addr, register, value):
         """ Write Word Data transaction. """
-        self._get_device(smbus_addr).write_word(register, value)
+        self._ack_device(smbus_addr).write_word_data(register, value)
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """
+        Combined transaction of i2c_msg writes and reads, with repeated start between messages.
+
+        Read messages are filled in place with data from the device, as smbus2 does.
+        """
+        for msg in i2c_msgs:
+            device = self._ack_device(msg.addr)
+            if msg.flags & I2C_M_RD:
+                msg.buf[:] = bytearray(device.i2c_read(msg.len))
+            else:
+                device.i2c_write(list(msg))
 
 
 class FakeSMBusDevice(object):
@@ -116,7 +192,8 @@ class FakeSMBusDevice(object):
         smbus._register_fake_device(self)
 
     def write_quick(self):
-        raise NotImplementedError
+        # Every device acknowledges its address, which is all a quick write does.
+        pass
 
     def read_byte(self):
         raise NotImplementedError
@@ -136,7 +213,7 @@ class FakeSMBusDevice(object):
     def block_process_call(self, register, value_list):
         raise NotImplementedError
 
-    def read_i2c_block_data(self, register):
+    def read_i2c_block_data(self, register, length):
         raise NotImplementedError
 
     def write_i2c_block_data(self, register, value_list):
@@ -153,3 +230,9 @@ class FakeSMBusDevice(object):
 
     def write_word_data(self, register, value):
         raise NotImplementedError
+
+    def i2c_read(self, length):
+        raise NotImplementedError
+
+    def i2c_write(self, byte_list):
+        raise NotImplementedError
@@ -0,0 +1,192 @@
+from .smbus import FakeSMBusDevice
+from rpi_hardware import TMP275
+from rpi_hardware.util.convert import swap_word
+
+
+class FakeTMP275(FakeSMBusDevice):
+    """
+    Fake Hardware for TMP275, to be talked to using TMP275 object for testing and simulation
+
+    Set `temperature` to change what the simulated sensor measures.  Temperature register holds
+    the value at the configured resolution.  In shutdown mode the temperature register only changes
+    when a one shot conversion is triggered.  Conversions complete immediately.
+
+    Give gpio_ref and alert_pin to simulate the ALERT output.  It is driven on the GPIO input pin
+    after every conversion, following thermostat mode, polarity and the T low / T high registers.
+    In interrupt mode, any read clears the alert.  Fault queue is not simulated.
+
+    Word reads and writes are low byte first, as smbus read_word_data and write_word_data are on a
+    real bus, while the chip itself sends registers MSB first.
+    """
+
+    _TEMPERATURE_REGISTER = 0x0
+    _CONFIGURATION_REGISTER = 0x1
+    _T_LOW_REGISTER = 0x2
+    _T_HIGH_REGISTER = 0x3
+
+    _CONFIG_SHUTDOWN_MODE = 0b00000001
+    _CONFIG_THERMOSTAT_MODE = 0b00000010
+    _CONFIG_ALERT_POLARITY = 0b00000100
+    _CONFIG_ONE_SHOT = 0b10000000
+    _RESOLUTION_SHIFT = 5
+
+    def __init__(self, smbus, address=0x48, temperature=25.0, gpio_ref=None, alert_pin=None):
+        """
+        Initalize object and attach to smbus.
+
+        :param smbus: mock smbus object.
+        :param address: I2C Address of Chip 0x48-0x4f
+        :param temperature: starting temperature in celcius
+        :param gpio_ref: mock GPIO object ALERT is connected to
+        :param alert_pin: GPIO input pin number ALERT is connected to
+        """
+        if address not in TMP275.ADDRESS_RANGE:
+            raise ValueError("Invalid address.  Valid value 0x48-0x4f.")
+        # Power on values: continuous 9 bit conversion, T low 75C and T high 80C
+        self._registers = {
+            self._TEMPERATURE_REGISTER: 0,
+            self._CONFIGURATION_REGISTER: 0,
+            self._T_LOW_REGISTER: TMP275._temp_to_bit_int(75),
+            self._T_HIGH_REGISTER: TMP275._temp_to_bit_int(80),
+        }
+        self._pointer = self._TEMPERATURE_REGISTER
+        self._temperature = temperature
+        self._gpio = gpio_ref
+        self._alert_pin = alert_pin
+        self.alert_active = False
+        # Interrupt mode alternates between watching for T high and T low
+        self._interrupt_waiting_low = False
+        super().__init__(smbus, address)
+        self._convert()
+        self._drive_alert_pin()
+
+    @property
+    def temperature(self):
+        return self._temperature
+
+    @temperature.setter
+    def temperature(self, celcius_value):
+        self._temperature = celcius_value
+        if not self.shutdown:
+            self._convert()
+
+    @property
+    def shutdown(self):
+        return bool(self._registers[self._CONFIGURATION_REGISTER] & self._CONFIG_SHUTDOWN_MODE)
+
+    @property
+    def bit_resolution(self):
+        config = self._registers[self._CONFIGURATION_REGISTER]
+        return 9 + ((config >> self._RESOLUTION_SHIFT) & 0x3)
+
+    def _convert(self):
+        """ Perform a conversion of `temperature` into temperature register. """
+        unused_bits = 16 - self.bit_resolution
+        value = TMP275._temp_to_bit_int(self._temperature)
+        self._registers[self._TEMPERATURE_REGISTER] = (value >> unused_bits) << unused_bits
+        self._update_alert()
+
+    def _register_temperature(self, register):
+        return TMP275._bit_int_to_temp(self._registers[register])
+
+    def _update_alert(self):
+        """ Set alert state from last conversion, as thermostat does at end of conversion. """
+        temperature = self._register_temperature(self._TEMPERATURE_REGISTER)
+        above_high = temperature >= self._register_temperature(self._T_HIGH_REGISTER)
+        below_low = temperature < self._register_temperature(self._T_LOW_REGISTER)
+        config = self._registers[self._CONFIGURATION_REGISTER]
+        if not config & self._CONFIG_THERMOSTAT_MODE:
+            # Comparator mode, active until temperature falls below T low
+            if above_high:
+                self._set_alert(True)
+            elif below_low:
+                self._set_alert(False)
+        elif not self.alert_active:
+            if self._interrupt_waiting_low and below_low:
+                self._interrupt_waiting_low = False
+                self._set_alert(True)
+            elif not self._interrupt_waiting_low and above_high:
+                self._interrupt_waiting_low = True
+                self._set_alert(True)
+
+    def _clear_interrupt(self):
+        """ Any read clears the alert in interrupt mode. """
+        if self._registers[self._CONFIGURATION_REGISTER] & self._CONFIG_THERMOSTAT_MODE:
+            self._set_alert(False)
+
+    def _set_alert(self, active):
+        self.alert_active = active
+        self._drive_alert_pin()
+
+    def _drive_alert_pin(self):
+        if self._gpio is None:
+            return
+        active_high = self._registers[self._CONFIGURATION_REGISTER] & self._CONFIG_ALERT_POLARITY
+        level = self._gpio.HIGH if bool(active_high) == self.alert_active else self._gpio.LOW
+        if self._gpio.input(self._alert_pin) != level:
+            self._gpio._simulate_set_pin(self._alert_pin, level)
+
+    def _set_pointer(self, register):
+        if register not in self._registers:
+            raise ValueError('Valid pointer registers are 0x00 to 0x03.')
+        self._pointer = register
+
+    def write_byte(self, byte):
+        self._set_pointer(byte)
+
+    def read_word_data(self, register):
+        self._set_pointer(register)
+        self._clear_interrupt()
+        if register == self._CONFIGURATION_REGISTER:
+            # Config is single byte, second byte read repeats it.
+            config = self._registers[register]
+            return (config << 8) | config
+        # SMBus words are low byte first, chip sends MSB first
+        return swap_word(self._registers[register])
+
+    def read_byte_data(self, register):
+        self._set_pointer(register)
+        self._clear_interrupt()
+        if register == self._CONFIGURATION_REGISTER:
+            return self._registers[register]
+        return self._registers[register] >> 8
+
+    def write_byte_data(self, register, value):
+        if register != self._CONFIGURATION_REGISTER:
+            raise ValueError('Only configuration register is written with a single byte.')
+        self._set_pointer(register)
+        # One shot bit always reads back as 0
+        self._registers[register] = value & 0xff & ~self._CONFIG_ONE_SHOT
+        self._drive_alert_pin()
+        if not self.shutdown or value & self._CONFIG_ONE_SHOT:
+            self._convert()
+
+    def write_word_data(self, register, value):
+        if register not in (self._T_LOW_REGISTER, self._T_HIGH_REGISTER):
+            raise ValueError('Only T low and T high registers are written with a word.')
+        self._set_pointer(register)
+        self._registers[register] = swap_word(value) & 0xfff0
+
+    def _register_bytes(self, register):
+        if register == self._CONFIGURATION_REGISTER:
+            return [self._registers[register]] * 2
+        value = self._registers[register]
+        return [value >> 8, value & 0xff]
+
+    def i2c_write(self, byte_list):
+        self._set_pointer(byte_list[0])
+        if len(byte_list) == 2:
+            self.write_byte_data(byte_list[0], byte_list[1])
+        elif len(byte_list) == 3:
+            # Bytes on the wire are MSB first, write_word_data takes SMBus low byte first order
+            self.write_word_data(byte_list[0], (byte_list[2] << 8) | byte_list[1])
+
+    def read_i2c_block_data(self, register, length):
+        self._set_pointer(register)
+        return self.i2c_read(length)
+
+    def i2c_read(self, length):
+        self._clear_interrupt()
+        # Reads past the register repeat the last byte
+        data = self._register_bytes(self._pointer)
+        return (data + [data[-1]] * length)[:length]
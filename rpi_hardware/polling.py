@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+Reading = namedtuple('Reading', 'timestamp name value')
+
+_log = logging.getLogger(__name__)
+
+
+class _Job(object):
+    def __init__(self, name, read, period, priority, bus):
+        self.name = name
+        self.read = read
+        self.period = period
+        self.priority = priority
+        self.bus = bus
+        self.active = True
+
+
+class SensorPoller(object):
+    """
+    One polling loop for every sensor, shared by every consumer.
+
+    Sensors are registered with a read method, a period and a priority.  Due reads are taken from a
+    heap ordered by due time then priority, lower priority values first.  Reads due together are
+    grouped by bus, each bus read one sensor after another on its own thread, so buses are read in
+    parallel but never have two transactions at once.
+
+    Each Reading is given to subscribers and kept as the latest value for its sensor.  A read that
+    raises is counted in errors and tried again next period, exceptions other than IOError or
+    ValueError are also logged.  A subscriber that raises is logged and counted in subscriber_errors,
+    and other subscribers still get the reading, so one faulty sensor or consumer never stops polling.
+
+    Call start to poll on a background thread, or run_once to poll due sensors from the calling thread.
+    """
+
+    _clock = staticmethod(monotonic)
+
+    def __init__(self, max_workers=None):
+        """
+        :param max_workers: thread limit for reading buses in parallel, defaults to one per bus
+        """
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._heap = []
+        self._jobs = {}
+        self._sequence = itertools.count()
+        self._subscribers = []
+        self._latest = {}
+        self.errors = {}
+        self.subscriber_errors = 0
+        self._executor = None
+        self._thread = None
+        self._running = False
+        self._wake = threading.Event()
+
+    def add(self, name, read, period, priority=0, bus=None, start=None):
+        """
+        Register sensor to be polled.
+
+        :param name: unique name for sensor, used in Reading
+        :param read: method called with no arguments to read sensor, such as tmp275.read_temperature
+        :param period: seconds between reads
+        :param priority: lower values are read first when due at the same time
+        :param bus: key of bus sensor is on, defaults to smbus of driver read is a method of
+        :param start: time of first read, defaults to now
+        """
+        if period <= 0:
+            raise ValueError('period must be positive.')
+        if bus is None:
+            bus = id(getattr(getattr(read, '__self__', None), '_smbus', read))
+        job = _Job(name, read, period, priority, bus)
+        with self._lock:
+            if name in self._jobs:
+                raise ValueError('Sensor {} already registered.'.format(name))
+            self._jobs[name] = job
+            self._schedule(job, self._clock() if start is None else start)
+        self._wake.set()
+
+    def remove(self, name):
+        """ Stop polling sensor. """
+        with self._lock:
+            job = self._jobs.pop(name)
+        job.active = False
+        self._latest.pop(name, None)
+
+    def _schedule(self, job, due):
+        heapq.heappush(self._heap, (due, job.priority, next(self._sequence), job))
+
+    def subscribe(self, callback):
+        """
+        :param callback: method called with each Reading, from the polling thread
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def latest(self, name):
+        """
+        Last reading of sensor.
+
+        :return: Reading or None if not read yet
+        """
+        return self._latest.get(name)
+
+    def next_due(self):
+        """ Time next sensor is due, or None if no sensors. """
+        with self._lock:
+            self._drop_inactive()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_inactive(self):
+        while self._heap and not self._heap[0][3].active:
+            heapq.heappop(self._heap)
+
+    def _due_jobs(self, now):
+        """ Pop due jobs, schedule their next read, and group by bus in priority order. """
+        buses = OrderedDict()
+        with self._lock:
+            self._drop_inactive()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, _, job = heapq.heappop(self._heap)
+                if not job.active:
+                    continue
+                buses.setdefault(job.bus, []).append(job)
+                next_due = due + job.period
+                if next_due <= now:
+                    # Fell behind, skip missed reads instead of bursting to catch up
+                    next_due = now + job.period
+                self._schedule(job, next_due)
+            self._drop_inactive()
+        return buses
+
+    def _read_bus(self, jobs):
+        readings = []
+        for job in jobs:
+            try:
+                value = job.read()
+            except Exception as e:
+                if not isinstance(e, (IOError, ValueError)):
+                    _log.exception('Unexpected error reading sensor %s', job.name)
+                self.errors[job.name] = self.errors.get(job.name, 0) + 1
+                continue
+            readings.append(Reading(self._clock(), job.name, value))
+        return readings
+
+    def run_once(self, now=None):
+        """
+        Read every sensor due at now and publish readings.
+
+        :param now: time to poll for, defaults to now
+        :return: list of Reading taken
+        """
+        buses = self._due_jobs(self._clock() if now is None else now)
+        if len(buses) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers or len(buses))
+            results = list(self._executor.map(self._read_bus, buses.values()))
+        else:
+            results = [self._read_bus(jobs) for jobs in buses.values()]
+        readings = [reading for bus_readings in results for reading in bus_readings]
+        for reading in readings:
+            self._latest[reading.name] = reading
+            for callback in list(self._subscribers):
+                try:
+                    callback(reading)
+                except Exception:
+                    self.subscriber_errors += 1
+                    _log.exception('Subscriber %r failed on reading of %s', callback, reading.name)
+        return readings
+
+    def start(self):
+        """ Poll on a background thread until stop is called. """
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='SensorPoller', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop background polling.
+
+        :param timeout: seconds to wait for polling thread to finish
+        """
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _run(self):
+        while self._running:
+            self._wake.clear()
+            self.run_once()
+            due = self.next_due()
+            self._wake.wait(None if due is None else max(0.0, due - self._clock()))
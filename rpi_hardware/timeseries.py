@@ -0,0 +1,178 @@
+import mmap
+import os
+import struct
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TimeSeriesStore(object):
+    """
+    Fixed capacity ring of (timestamp, device id, raw register value) samples, optionally in a file.
+
+    Each field is a fixed width column in one memory map: a header, then capacity timestamps as
+    doubles, device ids as unsigned shorts and raw values as unsigned shorts, native byte order.
+    Backed by a file, samples survive restarts, and other processes can open the same file to read
+    columns without copying through view or as_numpy.
+
+    The sample count is written to the header after each sample, so a reader never sees a sample
+    counted before it is written.  Readers wanting a consistent copy of a column while a writer is
+    running should check total did not move by more than capacity - len while copying.
+    """
+
+    FIELDS = (('timestamp', 'd'), ('device', 'H'), ('raw', 'H'))
+    _MAGIC = b'RPTS'
+    _VERSION = 1
+    _HEADER = struct.Struct('=4sHHQQ')
+    _DATA_OFFSET = 32
+
+    def __init__(self, path=None, capacity=None, readonly=False):
+        """
+        Create store, or open an existing one when path exists.
+
+        :param path: file backing store, None for memory only
+        :param capacity: number of samples held, needed when creating.  Must match existing file if given.
+        :param readonly: open existing file for reading only
+        :raises: ValueError if file is not a store or capacity does not match
+        """
+        self.path = path
+        self.readonly = readonly
+        if path is not None and os.path.exists(path):
+            self._mmap = self._open(path, capacity, readonly)
+        else:
+            if readonly:
+                raise ValueError('Cannot create store read only.')
+            if capacity is None or capacity < 1:
+                raise ValueError('capacity must be at least 1.')
+            self._mmap = self._create(path, capacity)
+        _, _, _, self.capacity, _ = self._HEADER.unpack_from(self._mmap, 0)
+        self._buffer = memoryview(self._mmap)
+        self._views = {}
+        offset = self._DATA_OFFSET
+        for name, typecode in self.FIELDS:
+            size = struct.calcsize(typecode) * self.capacity
+            self._views[name] = self._buffer[offset:offset + size].cast(typecode)
+            offset += size
+
+    @classmethod
+    def _size(cls, capacity):
+        return cls._DATA_OFFSET + sum(struct.calcsize(typecode) for _, typecode in cls.FIELDS) * capacity
+
+    def _create(self, path, capacity):
+        size = self._size(capacity)
+        if path is None:
+            data = mmap.mmap(-1, size)
+        else:
+            with open(path, 'w+b') as store_file:
+                store_file.truncate(size)
+                data = mmap.mmap(store_file.fileno(), size)
+        self._HEADER.pack_into(data, 0, self._MAGIC, self._VERSION, 0, capacity, 0)
+        return data
+
+    def _open(self, path, capacity, readonly):
+        with open(path, 'rb' if readonly else 'r+b') as store_file:
+            data = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+        if len(data) < self._DATA_OFFSET:
+            data.close()
+            raise ValueError('{} is not a time series store.'.format(path))
+        magic, version, _, stored_capacity, _ = self._HEADER.unpack_from(data, 0)
+        if magic != self._MAGIC or version != self._VERSION or len(data) != self._size(stored_capacity):
+            data.close()
+            raise ValueError('{} is not a time series store.'.format(path))
+        if capacity is not None and capacity != stored_capacity:
+            data.close()
+            raise ValueError('Store capacity is {}, not {}.'.format(stored_capacity, capacity))
+        return data
+
+    @property
+    def total(self):
+        """ Samples appended since store was created, read from header so writes by other processes show. """
+        return self._HEADER.unpack_from(self._mmap, 0)[4]
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def dropped(self):
+        """ Samples overwritten. """
+        return max(0, self.total - self.capacity)
+
+    @property
+    def head(self):
+        """ Index in columns that the next sample is written to, which is the oldest once full. """
+        return self.total % self.capacity
+
+    def append(self, timestamp, device, raw):
+        """
+        Add sample, overwriting oldest when full.
+
+        :param timestamp: seconds
+        :param device: device id 0-65535
+        :param raw: raw register value 0-65535
+        """
+        total = self.total
+        index = total % self.capacity
+        views = self._views
+        views['timestamp'][index] = timestamp
+        views['device'][index] = device
+        views['raw'][index] = raw
+        self._HEADER.pack_into(self._mmap, 0, self._MAGIC, self._VERSION, 0, self.capacity, total + 1)
+
+    def view(self, name):
+        """
+        Zero copy view of a whole column, in storage order.  Oldest sample is at head once full.
+
+        :param name: timestamp, device or raw
+        :return: memoryview of column
+        """
+        return self._views[name]
+
+    def as_numpy(self, name):
+        """
+        Zero copy NumPy array of a whole column, in storage order.
+
+        :param name: timestamp, device or raw
+        :return: numpy array sharing memory with store
+        """
+        if numpy is None:
+            raise ImportError('NumPy is needed for as_numpy.')
+        return numpy.frombuffer(self._views[name], dtype=self._views[name].format)
+
+    def column(self, name):
+        """
+        Copy of one field for all samples, oldest first.
+
+        :param name: timestamp, device or raw
+        :return: array of field values
+        """
+        view = self._views[name]
+        total = self.total
+        index = total % self.capacity
+        if total < self.capacity:
+            return array(view.format, view[:index])
+        return array(view.format, view[index:]) + array(view.format, view[:index])
+
+    def __iter__(self):
+        """ Samples as (timestamp, device, raw) tuples, oldest first. """
+        return zip(*(self.column(name) for name, _ in self.FIELDS))
+
+    def flush(self):
+        """ Write changes to file. """
+        if self.path is not None and not self.readonly:
+            self._mmap.flush()
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._buffer.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,3 +1,9 @@
+import threading
+from time import monotonic, sleep
+
+from .util import tracing
+from .util.convert import swap_word, tmp275_word_to_celcius
+from .util.i2c import i2c_msg_type, read_bytes
 
 
 class TMP275(object):
@@ -5,6 +11,9 @@ class TMP275(object):
     I2C driver for TMP275 temperature sensor
     """
 
+    # Addresses selectable with A0-A2 pins
+    ADDRESS_RANGE = range(0x48, 0x50)
+
     # Values to write to Pointer Register for Modes
     __TEMPERATURE_REGISTER = 0x0
     __CONFIGURATION_REGISTER = 0x1
@@ -29,7 +38,25 @@ class TMP275(object):
         11: 0b01000000,
         12: 0b01100000
     }
-    __CONFIG_ONE_SHOT = 0b1000000
+    __CONFIG_ONE_SHOT = 0b10000000
+
+    # Typical conversion time in seconds for each bit resolution
+    CONVERSION_TIME = {
+        9: 0.0275,
+        10: 0.055,
+        11: 0.11,
+        12: 0.22
+    }
+
+    # Maximum conversion time in seconds for each bit resolution, waited for one shot conversions
+    MAX_CONVERSION_TIME = {
+        9: 0.0375,
+        10: 0.075,
+        11: 0.15,
+        12: 0.3
+    }
+
+    _clock = staticmethod(monotonic)
 
     def __init__(self,
                  smbus_ref,
@@ -43,7 +70,7 @@ class TMP275(object):
         :param debug: Boolean for debug
         :return: None
         """
-        if not 0x48 <= address <= 0x4f:
+        if address not in self.ADDRESS_RANGE:
             raise ValueError("Invalid address.  Valid value 0x48-0x4f.")
 
         self._smbus = smbus_ref
@@ -52,6 +79,18 @@ class TMP275(object):
         self._config = 0
         # self._write_config()
         #
+        # Sampling state, see sample_temperature
+        self._sample = None
+        self._next_sample_time = None
+        self._conversion_start = None
+        self._one_shot_ready = None
+        # Shadow of pointer and register values on the device, to skip redundant writes.
+        # Unknown until written by this object.  Lock keeps shadow and device in step when a
+        # sensor is shared by threads, such as with TMP275AlertMonitor.
+        self._lock = threading.RLock()
+        self._pointer = None
+        self._shadow = {}
+        self._pointerless_reads = i2c_msg_type(smbus_ref) is not None
 
     @staticmethod
     def _temp_to_bit_int(celcius_temp):
@@ -71,18 +110,50 @@ class TMP275(object):
 
     @staticmethod
     def _bit_int_to_temp(temp_bytes):
-        # Convert (MMMMMMMM, LLLL0000) to MMMMMMMMLLLL
-        int_temp = temp_bytes >> 4
-        if int_temp > 0x7ff:
-            # 2s compliment conversion
-            int_temp -= 0x1000
-        return int_temp / 16.0
+        # Convert (MMMMMMMM, LLLL0000) to MMMMMMMMLLLL, see util.convert for bulk conversion
+        return tmp275_word_to_celcius(temp_bytes)
+
+    @staticmethod
+    def _smbus_word_to_register(smbus_word):
+        # SMBus words arrive low byte first, the TMP275 sends MSB first
+        return swap_word(smbus_word)
+
+    def forget_shadow(self):
+        """
+        Forget pointer and register values written, so next access writes them again.
+
+        Use after the device has been power cycled or written by another bus master.
+        """
+        with self._lock:
+            self._pointer = None
+            self._shadow = {}
+
+    def _write_register(self, register, value):
+        """
+        Write register, unless the device already holds value.
+
+        :return: True if a write was done
+        """
+        with self._lock:
+            if self._shadow.get(register) == value:
+                return False
+            tracer = tracing.tracer
+            start = tracer.clock() if tracer else 0
+            if register == self.__CONFIGURATION_REGISTER:
+                self._smbus.write_byte_data(self._address, register, value)
+            else:
+                self._smbus.write_word_data(self._address, register, swap_word(value))
+            self._pointer = register
+            self._shadow[register] = value
+        if tracer:
+            tracer.record('TMP275', self._address, register, value, None, start)
+        return True
 
     def write_t_low_register(self, celcius_value):
-        self._smbus.write_word_data(self._address, self.__T_LOW_REGISTER, self._temp_to_bit_int(celcius_value))
+        self._write_register(self.__T_LOW_REGISTER, self._temp_to_bit_int(celcius_value))
 
     def write_t_high_register(self, celcius_value):
-        self._smbus.write_word_data(self._address, self.__T_HIGH_REGISTER, self._temp_to_bit_int(celcius_value))
+        self._write_register(self.__T_HIGH_REGISTER, self._temp_to_bit_int(celcius_value))
 
     def _build_configuration(self, shutdown_mode, thermostat_mode, alert_polarity,
                              fault_queue, bit_resolution):
@@ -131,17 +202,225 @@ class TMP275(object):
         """
         self._config = self._build_configuration(shutdown_mode, thermostat_mode, alert_polarity,
                                                  fault_queue, bit_resolution)
-        self._smbus.write_byte_data(self._address, self.__CONFIGURATION_REGISTER, self._config)
+        if not self._write_register(self.__CONFIGURATION_REGISTER, self._config):
+            return
+        # New resolution applies from the next conversion
+        self._conversion_start = self._clock()
+        self._next_sample_time = self._next_conversion_time(self._conversion_start)
+
+    @property
+    def thermostat_mode(self):
+        """ 0 = Comparator Mode, 1 = Interrupt Mode, as last written with write_configuration. """
+        return int(bool(self._config & self.__CONFIG_THERMOSTAT_MODE))
+
+    @property
+    def alert_polarity(self):
+        """ Alert pin ACTIVE 0 = Low, 1 = High, as last written with write_configuration. """
+        return int(bool(self._config & self.__CONFIG_ALERT_POLARITY))
+
+    @property
+    def bit_resolution(self):
+        """ Conversion resolution in bits, as last written with write_configuration. """
+        resolution_bits = self._config & self.__CONFIG_CONVERTER_RESOLUTION_MASK
+        for bits, value in self.__CONFIG_CONVERTER_RESOLUTION_BITS.items():
+            if value == resolution_bits:
+                return bits
+
+    @property
+    def conversion_time(self):
+        """ Conversion time in seconds for current bit resolution. """
+        return self.CONVERSION_TIME[self.bit_resolution]
+
+    @property
+    def max_conversion_time(self):
+        """ Longest conversion time in seconds for current bit resolution, from the datasheet. """
+        return self.MAX_CONVERSION_TIME[self.bit_resolution]
+
+    @property
+    def next_sample_time(self):
+        """
+        Clock time (time.monotonic) when sample_temperature will next read a fresh conversion.
+
+        None if nothing has been sampled yet or in shutdown mode, where conversions do not run.
+        Pollers can sleep until this time instead of spinning.
+        """
+        return self._next_sample_time
+
+    def _next_conversion_time(self, now):
+        if self._config & self.__CONFIG_SHUTDOWN_MODE:
+            return None
+        if self._conversion_start is None:
+            # Conversion phase is unknown, a full conversion time from now is certain to be fresh
+            self._conversion_start = now
+        conversion_time = self.conversion_time
+        conversions = int((now - self._conversion_start) / conversion_time) + 1
+        return self._conversion_start + conversions * conversion_time
+
+    def sample_temperature(self):
+        """
+        Gives temperature, only reading the device when a new conversion can be ready.
+
+        Continuous conversions finish every `conversion_time`, so calls before `next_sample_time`
+        return the cached value without bus traffic.
+
+        :return: temperature in celcius
+        """
+        now = self._clock()
+        if self._sample is None or (self._next_sample_time is not None and now >= self._next_sample_time):
+            self._sample = self.read_temperature()
+            self._next_sample_time = self._next_conversion_time(now)
+        return self._sample
+
+    def trigger_one_shot(self):
+        """
+        Writes 1 to OS bit in configuration register to start a single conversion while in shutdown mode.
+
+        Completion allows for the maximum conversion time, as typical is often exceeded.
+
+        :return: clock time (time.monotonic) when conversion will be complete
+        :raises: ValueError if not configured with shutdown_mode=1
+        """
+        if not self._config & self.__CONFIG_SHUTDOWN_MODE:
+            raise ValueError("One shot conversion requires shutdown_mode=1.")
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        config = self._config | self.__CONFIG_ONE_SHOT
+        with self._lock:
+            self._smbus.write_byte_data(self._address, self.__CONFIGURATION_REGISTER, config)
+            # OS bit clears itself, so device is left holding the config
+            self._pointer = self.__CONFIGURATION_REGISTER
+            self._shadow[self.__CONFIGURATION_REGISTER] = self._config
+        if tracer:
+            tracer.record('TMP275', self._address, self.__CONFIGURATION_REGISTER, config, None, start)
+        self._one_shot_ready = self._clock() + self.max_conversion_time
+        return self._one_shot_ready
+
+    def collect_one_shot(self):
+        """
+        Waits for conversion started with trigger_one_shot to complete and reads it.
+
+        :return: temperature in celcius
+        :raises: ValueError if trigger_one_shot was not called
+        """
+        if self._one_shot_ready is None:
+            raise ValueError("No one shot conversion triggered.")
+        remaining = self._one_shot_ready - self._clock()
+        if remaining > 0:
+            sleep(remaining)
+        self._one_shot_ready = None
+        self._sample = self.read_temperature()
+        return self._sample
 
     def one_shot(self):
         """
-        Writes 1 to OS bit in configuration register to wake device and
-        :return:
+        Single conversion while in shutdown mode.
+
+        Outside shutdown mode conversions run continuously, so the latest is read without waiting.
+        Use trigger_one_shot to have ValueError raised instead.
+
+        :return: temperature in celcius
         """
-        temp_config = self._config & self.__CONFIG_ONE_SHOT
-        self._smbus.write_byte_data(self._address, self.__CONFIGURATION_REGISTER, temp_config)
-        return self.read_temperature()
+        if not self._config & self.__CONFIG_SHUTDOWN_MODE:
+            self._sample = self.read_temperature()
+            return self._sample
+        self.trigger_one_shot()
+        return self.collect_one_shot()
 
     def read_temperature(self):
-        temp_bytes = self._smbus.read_word_data(self._address, self.__TEMPERATURE_REGISTER)
-        return self._bit_int_to_temp(temp_bytes)
+        tracer = tracing.tracer
+        start = tracer.clock() if tracer else 0
+        with self._lock:
+            if self._pointer == self.__TEMPERATURE_REGISTER and self._pointerless_reads:
+                # Pointer already at temperature, read without writing it again
+                msb, lsb = read_bytes(self._smbus, self._address, 2)
+                smbus_word = (lsb << 8) | msb
+            else:
+                smbus_word = self._smbus.read_word_data(self._address, self.__TEMPERATURE_REGISTER)
+                self._pointer = self.__TEMPERATURE_REGISTER
+        temp_bytes = self._smbus_word_to_register(smbus_word)
+        temperature = self._bit_int_to_temp(temp_bytes)
+        if tracer:
+            tracer.record('TMP275', self._address, self.__TEMPERATURE_REGISTER, temp_bytes, temperature, start)
+        return temperature
+
+
+def one_shot_all(sensors):
+    """
+    One shot conversion for a fleet of TMP275 in shutdown mode, which may be spread over several buses.
+
+    Every sensor is triggered first, then a single wait for the slowest conversion, then all are read.
+    N sensors take about one conversion time instead of N.
+
+    :param sensors: iterable of TMP275 objects configured with shutdown_mode=1
+    :return: list of temperatures in celcius, in order of sensors
+    """
+    sensors = list(sensors)
+    if not sensors:
+        return []
+    ready_time = max(sensor.trigger_one_shot() for sensor in sensors)
+    remaining = ready_time - TMP275._clock()
+    if remaining > 0:
+        sleep(remaining)
+    return [sensor.collect_one_shot() for sensor in sensors]
+
+
+class TMP275AlertMonitor(object):
+    """
+    Watches TMP275 ALERT pins with GPIO edge detection, instead of polling every sensor.
+
+    Each sensor's ALERT output is wired to its own GPIO input.  When a pin becomes active,
+    only that sensor is read and callback is called with (sensor, temperature).  In interrupt
+    thermostat_mode, the read also clears the alert.
+
+    Thresholds are set with write_t_low_register and write_t_high_register, and
+    write_configuration should select thermostat_mode=1 and the alert_polarity of the wiring.
+    """
+
+    def __init__(self, gpio_ref, callback):
+        """
+        :param gpio_ref: reference to RPi.GPIO object
+        :param callback: method called with (sensor, temperature) when a sensor alerts
+        """
+        self._gpio = gpio_ref
+        self._callback = callback
+        self._sensors = {}
+
+    def add_sensor(self, alert_pin, sensor):
+        """
+        Start watching ALERT pin of sensor.
+
+        :param alert_pin: GPIO pin number ALERT is connected to
+        :param sensor: TMP275 object
+        :return: None
+        """
+        if alert_pin in self._sensors:
+            raise ValueError('alert_pin {} is already monitored.'.format(alert_pin))
+        # ALERT is open drain, so pull to inactive level
+        if sensor.alert_polarity:
+            pull, edge = self._gpio.PUD_DOWN, self._gpio.RISING
+        else:
+            pull, edge = self._gpio.PUD_UP, self._gpio.FALLING
+        self._gpio.setup(alert_pin, self._gpio.IN, pull_up_down=pull)
+        self._sensors[alert_pin] = sensor
+        self._gpio.add_event_detect(alert_pin, edge, callback=self._alerted)
+
+    def remove_sensor(self, alert_pin):
+        """
+        Stop watching ALERT pin.
+
+        :param alert_pin: GPIO pin number given to add_sensor
+        :return: TMP275 object that was watched
+        """
+        self._gpio.remove_event_detect(alert_pin)
+        return self._sensors.pop(alert_pin)
+
+    def close(self):
+        """ Stop watching all ALERT pins. """
+        for alert_pin in list(self._sensors):
+            self.remove_sensor(alert_pin)
+
+    def _alerted(self, alert_pin):
+        sensor = self._sensors.get(alert_pin)
+        if sensor is None:
+            return
+        self._callback(sensor, sensor.read_temperature())
@@ -1,3 +1,6 @@
 from .singleton import Singleton
-from .crc import crc8_check, crc8_value
-from .decorators import simple_decorator, cached_with_immediate
+from .crc import crc8_check, crc8_value, Crc8, CrcModel
+from .decorators import simple_decorator, cached_with_immediate, ttl_cache, single_flight_cache
+from .i2c import write_then_read, read_bytes
+from .files import atomic_write
+from .ring_buffer import RingBuffer
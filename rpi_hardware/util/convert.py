@@ -0,0 +1,135 @@
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def twos_complement(value, bits=16):
+    """
+    Signed value of a two's complement integer.
+
+    :param value: unsigned integer
+    :param bits: width of value
+    :return: signed integer
+    """
+    if value & (1 << (bits - 1)):
+        return value - (1 << bits)
+    return value
+
+
+def swap_word(word):
+    """
+    Swap bytes of a 16 bit word.
+
+    SMBus read_word_data and write_word_data send the low byte first, TMP275 and INA219 registers
+    are sent high byte first, so words are swapped between the two.
+    """
+    return ((word & 0xff) << 8) | (word >> 8)
+
+
+def tmp275_word_to_celcius(word, bit_resolution=12):
+    """
+    TMP275 temperature register word to celcius.
+
+    :param word: register value MMMMMMMMLLLL0000
+    :param bit_resolution: conversion resolution 9-12, lower bits are masked off
+    :return: temperature in celcius
+    """
+    word &= _resolution_mask(bit_resolution)
+    return twos_complement(word >> 4, 12) / 16.0
+
+
+def ina219_shunt_word_to_millivolts(word):
+    """
+    INA219 shunt voltage register word to millivolts.  Register is sign extended two's complement, 10uV LSB.
+    """
+    return twos_complement(word) / 100
+
+
+def ina219_bus_word_to_millivolts(word):
+    """
+    INA219 bus voltage register word to millivolts.  Voltage is in the top 13 bits, 4mV LSB.
+    """
+    return (word >> 3) * 4
+
+
+def _resolution_mask(bit_resolution):
+    if bit_resolution not in (9, 10, 11, 12):
+        raise ValueError("Invalid bit_resolution: {}.  Valid values 9, 10, 11, 12.".format(bit_resolution))
+    return (0xffff << (16 - bit_resolution)) & 0xffff
+
+
+@lru_cache(maxsize=None)
+def _table(converter, *args):
+    return [converter(word, *args) for word in range(0x10000)]
+
+
+def _is_numpy(words):
+    return numpy is not None and isinstance(words, numpy.ndarray)
+
+
+def _numpy_words(words, swap_bytes):
+    words = words.astype(numpy.uint16, copy=False)
+    if swap_bytes:
+        words = words.byteswap()
+    return words
+
+
+def _convert(words, swap_bytes, converter, *args):
+    """
+    Convert words with a 65536 entry lookup table, built once per converter and arguments.
+
+    A conversion is then a single C level pass over the words.
+    """
+    if swap_bytes or not isinstance(words, array) or words.typecode != 'H':
+        words = array('H', words)
+    if swap_bytes:
+        # Words logged with SMBus read_word_data are little endian, registers are big endian
+        words.byteswap()
+    return array('d', map(_table(converter, *args).__getitem__, words))
+
+
+def tmp275_to_celcius(words, bit_resolution=12, swap_bytes=False):
+    """
+    Bulk TMP275 temperature register words to celcius.
+
+    Returns a NumPy array when given one, otherwise an array('d').
+
+    :param words: raw temperature register words
+    :param bit_resolution: conversion resolution 9-12, lower bits are masked off
+    :param swap_bytes: swap bytes of each word first
+    :return: temperatures in celcius
+    """
+    if _is_numpy(words):
+        words = _numpy_words(words, swap_bytes) & _resolution_mask(bit_resolution)
+        return (words.view(numpy.int16) >> 4) / 16.0
+    return _convert(words, swap_bytes, tmp275_word_to_celcius, bit_resolution)
+
+
+def ina219_shunt_to_millivolts(words, swap_bytes=False):
+    """
+    Bulk INA219 shunt voltage register words to millivolts.
+
+    :param words: raw shunt voltage register words
+    :param swap_bytes: swap bytes of each word first
+    :return: shunt voltages in millivolts
+    """
+    if _is_numpy(words):
+        return _numpy_words(words, swap_bytes).view(numpy.int16) / 100
+    return _convert(words, swap_bytes, ina219_shunt_word_to_millivolts)
+
+
+def ina219_bus_to_millivolts(words, swap_bytes=False):
+    """
+    Bulk INA219 bus voltage register words to millivolts.  Conversion ready and overflow flags are dropped.
+
+    :param words: raw bus voltage register words
+    :param swap_bytes: swap bytes of each word first
+    :return: bus voltages in millivolts
+    """
+    if _is_numpy(words):
+        return (_numpy_words(words, swap_bytes) >> 3) * 4.0
+    return _convert(words, swap_bytes, ina219_bus_word_to_millivolts)
@@ -1,3 +1,11 @@
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 def _add_to_crc8(b, crc):
     if b < 0:
         b += 256
@@ -10,17 +18,59 @@ def _add_to_crc8(b, crc):
     return crc
 
 
+# Dallas/Maxim CRC8 of every byte value, starting from 0.  As the CRC is linear,
+# crc8 of next byte b from crc is _CRC8_TABLE[crc ^ b].
+_CRC8_TABLE = tuple(_add_to_crc8(b, 0) for b in range(256))
+
+
+def _crc8_update(crc, data):
+    table = _CRC8_TABLE
+    if isinstance(data, memoryview) and data.format != 'B':
+        data = data.cast('B')
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        for cur_byte in data:
+            crc = table[crc ^ cur_byte]
+    else:
+        for cur_byte in data:
+            crc = table[crc ^ (cur_byte & 0xFF)]
+    return crc
+
+
+class Crc8(object):
+    """
+    Incremental CRC8, for data arriving in pieces.
+
+    Gives the same value as crc8_value of all data given to update.
+    """
+
+    def __init__(self, data=b''):
+        """
+        :param data: initial bytes, bytearray, memoryview or sequence of byte values
+        """
+        self.value = _crc8_update(0, data)
+
+    def update(self, data):
+        """
+        Add data to CRC.
+
+        :param data: bytes, bytearray, memoryview or sequence of byte values
+        :return: self
+        """
+        self.value = _crc8_update(self.value, data)
+        return self
+
+    def reset(self):
+        self.value = 0
+
+
 def crc8_value(byte_list):
     """
     Gives CRC8 value for sequence of bytes.
 
-    :param byte_list: list of byte values
+    :param byte_list: bytes, bytearray, memoryview or list of byte values
     :return: CRC8 single byte value as integer
     """
-    check = 0
-    for cur_byte in byte_list:
-        check = _add_to_crc8(cur_byte, check)
-    return check
+    return _crc8_update(0, byte_list)
 
 
 def crc8_check(byte_list, crc_value):
@@ -31,3 +81,165 @@ def crc8_check(byte_list, crc_value):
     :return:
     """
     return crc8_value(byte_list) == crc_value
+
+
+def _reflect(value, width):
+    result = 0
+    for _ in range(width):
+        result = (result << 1) | (value & 1)
+        value >>= 1
+    return result
+
+
+@lru_cache(maxsize=None)
+def _crc_table(width, poly, reflected):
+    """ 256 entry table for a CRC, built on first use of each parameter set. """
+    mask = (1 << width) - 1
+    table = []
+    if reflected:
+        poly = _reflect(poly, width)
+        for b in range(256):
+            crc = b
+            for _ in range(8):
+                crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+            table.append(crc)
+    else:
+        top_bit = 1 << (width - 1)
+        for b in range(256):
+            crc = b << (width - 8)
+            for _ in range(8):
+                crc = (crc << 1) ^ poly if crc & top_bit else crc << 1
+            table.append(crc & mask)
+    return tuple(table)
+
+
+class CrcModel(object):
+    """
+    CRC described by the usual Rocksoft parameters: width, poly, init, refin, refout and xorout.
+
+    Lookup tables are built lazily and shared by models with the same width, poly and refin.
+    """
+
+    def __init__(self, width, poly, init=0, refin=False, refout=False, xorout=0, name=None):
+        """
+        :param width: CRC width in bits, 8 or more
+        :param poly: polynomial, normal (not reflected) form without top bit
+        :param init: initial register value
+        :param refin: reflect each input byte
+        :param refout: reflect result before xorout
+        :param xorout: value XORed with result
+        :param name: name for repr
+        """
+        if width < 8:
+            raise ValueError('width must be at least 8 bits.')
+        self.width = width
+        self.poly = poly
+        self.init = init
+        self.refin = refin
+        self.refout = refout
+        self.xorout = xorout
+        self.name = name
+        self._mask = (1 << width) - 1
+        # Register holds reflected CRC when input is reflected
+        self._start = _reflect(init, width) if refin else init
+        self._reflect_result = refin != refout
+
+    def __repr__(self):
+        return 'CrcModel({})'.format(self.name or 'width={}, poly={:#x}'.format(self.width, self.poly))
+
+    @property
+    def table(self):
+        return _crc_table(self.width, self.poly, self.refin)
+
+    def _update(self, crc, data):
+        table = self.table
+        if isinstance(data, memoryview) and data.format != 'B':
+            data = data.cast('B')
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(cur_byte & 0xFF for cur_byte in data)
+        if self.refin:
+            for cur_byte in data:
+                crc = table[(crc ^ cur_byte) & 0xFF] ^ (crc >> 8)
+        else:
+            shift = self.width - 8
+            mask = self._mask
+            for cur_byte in data:
+                crc = table[((crc >> shift) ^ cur_byte) & 0xFF] ^ ((crc << 8) & mask)
+        return crc
+
+    def _finish(self, crc):
+        if self._reflect_result:
+            crc = _reflect(crc, self.width)
+        return crc ^ self.xorout
+
+    def value(self, data):
+        """
+        CRC of data.
+
+        :param data: bytes, bytearray, memoryview or sequence of byte values
+        :return: CRC as integer
+        """
+        return self._finish(self._update(self._start, data))
+
+    def check(self, data, crc_value):
+        return self.value(data) == crc_value
+
+    def check_frames(self, frames, frame_size, byteorder='big'):
+        """
+        Check many fixed size frames, each holding data followed by its CRC, in one call.
+
+        With NumPy, the CRC of all frames is calculated a byte position at a time across every
+        frame.  Without it frames are checked one at a time.
+
+        :param frames: concatenated frames as bytes, bytearray, memoryview or NumPy uint8 array
+        :param frame_size: bytes per frame, including CRC
+        :param byteorder: byte order of CRC within frame
+        :return: NumPy bool array if given a NumPy array, otherwise list of bool for each frame
+        """
+        crc_size = (self.width + 7) // 8
+        if frame_size <= crc_size:
+            raise ValueError('frame_size must be larger than CRC size of {} bytes.'.format(crc_size))
+        if numpy is not None and (isinstance(frames, numpy.ndarray) or len(frames) >= 64 * frame_size):
+            return self._check_frames_numpy(frames, frame_size, crc_size, byteorder)
+        data = memoryview(frames).cast('B')
+        if len(data) % frame_size:
+            raise ValueError('Data length {} is not a multiple of frame_size.'.format(len(data)))
+        results = []
+        for start in range(0, len(data), frame_size):
+            payload_end = start + frame_size - crc_size
+            expected = int.from_bytes(data[payload_end:start + frame_size], byteorder)
+            results.append(self.value(data[start:payload_end]) == expected)
+        return results
+
+    def _check_frames_numpy(self, frames, frame_size, crc_size, byteorder):
+        given_array = isinstance(frames, numpy.ndarray)
+        data = numpy.frombuffer(frames, dtype=numpy.uint8) if not given_array else frames
+        data = data.astype(numpy.uint8, copy=False).reshape(-1)
+        if data.size % frame_size:
+            raise ValueError('Data length {} is not a multiple of frame_size.'.format(data.size))
+        data = data.reshape(-1, frame_size).astype(numpy.uint64)
+        table = numpy.array(self.table, dtype=numpy.uint64)
+        crc = numpy.full(data.shape[0], self._start, dtype=numpy.uint64)
+        shift = numpy.uint64(self.width - 8)
+        byte_mask, eight, mask = numpy.uint64(0xFF), numpy.uint64(8), numpy.uint64(self._mask)
+        for column in data[:, :frame_size - crc_size].T:
+            if self.refin:
+                crc = table[(crc ^ column) & byte_mask] ^ (crc >> eight)
+            else:
+                crc = table[((crc >> shift) ^ column) & byte_mask] ^ ((crc << eight) & mask)
+        if self._reflect_result:
+            crc = numpy.array([_reflect(int(value), self.width) for value in crc], dtype=numpy.uint64)
+        crc ^= numpy.uint64(self.xorout)
+        crc_bytes = data[:, frame_size - crc_size:]
+        if byteorder == 'little':
+            crc_bytes = crc_bytes[:, ::-1]
+        expected = numpy.zeros(data.shape[0], dtype=numpy.uint64)
+        for column in crc_bytes.T:
+            expected = (expected << eight) | column
+        result = crc == expected
+        return result if given_array else result.tolist()
+
+
+CRC8_MAXIM = CrcModel(8, 0x31, refin=True, refout=True, name='CRC-8/MAXIM')
+CRC8_SENSIRION = CrcModel(8, 0x31, init=0xFF, name='CRC-8/SENSIRION')
+CRC8_SMBUS = CrcModel(8, 0x07, name='CRC-8/SMBUS')
@@ -1,5 +1,8 @@
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
+from time import monotonic
 
 
 def simple_decorator(decorator):
@@ -39,7 +42,8 @@ def cached_with_immediate(call_time):
     few millisecond hardware process returns much faster if called often, as the hardware query and conversion
     is skipped.
 
-    Using property of default _cached dictionary staying with the function definition.
+    Using property of default _cached dictionary staying with the function definition.  So one value is
+    shared by every instance and argument set.  Use ttl_cache when caching methods or functions with arguments.
 
     Example:
     @decorators.cached_with_immediate(call_time=30)
@@ -58,3 +62,180 @@ def cached_with_immediate(call_time):
             return _cached['value']
         return wraps(main_func)(_decorator)
     return _cached_with_immediate
+
+
+_KWARGS_MARK = object()
+
+
+def _make_key(args, kwargs):
+    key = args
+    if kwargs:
+        key += (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+    return key
+
+
+class _TtlCache(object):
+    """
+    Bounded mapping of key to (time stored, value), least recently used dropped first.
+    """
+
+    _clock = staticmethod(monotonic)
+
+    def __init__(self, maxsize):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def lookup(self, key):
+        """
+        :return: (age in seconds, value) or None if not stored
+        """
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        stored, value = entry
+        return self._clock() - stored, value
+
+    def store(self, key, value):
+        with self.lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def ttl_cache(ttl, maxsize=128):
+    """
+    Decorator caching results for ttl seconds, separately for each argument set.
+
+    For methods, self is part of the arguments, so each instance has its own cached value.  Cached
+    results keep references to their arguments until dropped, once more than maxsize are stored the
+    least recently used is dropped.  Ages use time.monotonic, so clock changes do not affect caching.
+
+    Can specify immediate=True to make a call ignoring cached value.  The new value is cached.
+
+    Example:
+    class Sensor(object):
+        @decorators.ttl_cache(ttl=30)
+        def temperature(self):
+            return something_that_took_a_long_time_to_get
+
+    :param ttl: seconds a result is used for
+    :param maxsize: maximum number of argument sets cached
+    """
+    def _ttl_cache(main_func):
+        cache = _TtlCache(maxsize)
+
+        @wraps(main_func)
+        def _decorator(*args, immediate=False, **kwargs):
+            key = _make_key(args, kwargs)
+            if not immediate:
+                entry = cache.lookup(key)
+                if entry is not None and entry[0] <= ttl:
+                    return entry[1]
+            value = main_func(*args, **kwargs)
+            cache.store(key, value)
+            return value
+        _decorator.cache_clear = cache.clear
+        _decorator.cache = cache
+        return _decorator
+    return _ttl_cache
+
+
+class _Flight(object):
+    """ A read in progress, shared by every caller asking for the same key. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def single_flight_cache(ttl, maxsize=128, stale_while_revalidate=False):
+    """
+    Decorator caching results like ttl_cache, where concurrent misses share one call.
+
+    When several threads miss the same argument set at once, the first makes the call and the rest
+    wait for its result, or its exception.  So the hardware is read once instead of once per thread.
+
+    With stale_while_revalidate, an expired value is returned immediately and refreshed on a
+    background thread, so callers only wait on the first read.  If a refresh fails, the old value
+    is kept and the next call tries again.
+
+    Can specify immediate=True to make a call ignoring cached value.  It always makes its own call,
+    rather than waiting on one in progress, and the new value is cached.
+
+    :param ttl: seconds a result is fresh for
+    :param maxsize: maximum number of argument sets cached
+    :param stale_while_revalidate: return expired values while refreshing in background
+    """
+    def _single_flight_cache(main_func):
+        cache = _TtlCache(maxsize)
+        flights = {}
+
+        def _join(key):
+            """ Flight for key, registered under the lock.  Returns (flight, True if caller leads it). """
+            with cache.lock:
+                flight = flights.get(key)
+                if flight is not None:
+                    return flight, False
+                flight = flights[key] = _Flight()
+                return flight, True
+
+        def _lead(key, flight, args, kwargs):
+            try:
+                flight.value = main_func(*args, **kwargs)
+                cache.store(key, flight.value)
+            except Exception as error:
+                flight.error = error
+            finally:
+                with cache.lock:
+                    del flights[key]
+                flight.done.set()
+
+        def _fetch(key, args, kwargs):
+            flight, leader = _join(key)
+            if leader:
+                _lead(key, flight, args, kwargs)
+            else:
+                flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        @wraps(main_func)
+        def _decorator(*args, immediate=False, **kwargs):
+            key = _make_key(args, kwargs)
+            if immediate:
+                # Own read, not joined to one in progress, which may have started before the call
+                value = main_func(*args, **kwargs)
+                cache.store(key, value)
+                return value
+            entry = cache.lookup(key)
+            if entry is not None:
+                age, value = entry
+                if age <= ttl:
+                    return value
+                if stale_while_revalidate:
+                    flight, leader = _join(key)
+                    if leader:
+                        # Failed refresh keeps the old value, error is dropped with the flight
+                        threading.Thread(target=_lead, args=(key, flight, args, kwargs),
+                                         name='{}-refresh'.format(main_func.__name__), daemon=True).start()
+                    return value
+            return _fetch(key, args, kwargs)
+        _decorator.cache_clear = cache.clear
+        _decorator.cache = cache
+        return _decorator
+    return _single_flight_cache
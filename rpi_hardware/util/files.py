@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+
+def atomic_write(path, data):
+    """
+    Write file so readers see either the old or the new contents, never a partial file.
+
+    Data is written to a temporary file in the same directory, synced, then renamed over path.
+
+    :param path: file path to write
+    :param data: bytes or str to write
+    :return: None
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
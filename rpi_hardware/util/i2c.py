@@ -0,0 +1,66 @@
+import sys
+
+
+def i2c_msg_type(smbus_ref):
+    """
+    Find the i2c_msg class that goes with an smbus object.
+
+    smbus2 and mocked.smbus define i2c_msg next to SMBus and support combined transactions with i2c_rdwr.
+    The original smbus module has neither, so None is returned and only SMBus transactions are available.
+
+    :param smbus_ref: smbus object, as create with smbus.Smbus(bus_number) or mock smbus object.
+    :return: i2c_msg class or None
+    """
+    # Wrappers, such as MeteredSMBus, give the i2c_msg of the bus they wrap
+    msg_type = getattr(smbus_ref, 'i2c_msg', None)
+    if msg_type is not None:
+        return msg_type
+    if not hasattr(smbus_ref, 'i2c_rdwr'):
+        return None
+    module = sys.modules.get(type(smbus_ref).__module__)
+    return getattr(module, 'i2c_msg', None)
+
+
+def write_then_read(smbus_ref, address, write_bytes, read_length):
+    """
+    Combined write then read, with repeated start, as a single bus transaction.
+
+    Uses i2c_rdwr when available.  Otherwise a single byte write is done as read_i2c_block_data,
+    which is the same transaction on the wire.
+
+    :param smbus_ref: smbus object
+    :param address: I2C address of device
+    :param write_bytes: list of bytes to write, usually the register pointer
+    :param read_length: number of bytes to read
+    :return: list of bytes read
+    """
+    msg_type = i2c_msg_type(smbus_ref)
+    if msg_type is None:
+        if len(write_bytes) != 1:
+            raise ValueError('Multiple byte write requires i2c_rdwr support.')
+        return list(smbus_ref.read_i2c_block_data(address, write_bytes[0], read_length))
+    read = msg_type.read(address, read_length)
+    smbus_ref.i2c_rdwr(msg_type.write(address, write_bytes), read)
+    return list(read)
+
+
+def read_bytes(smbus_ref, address, length):
+    """
+    Read bytes without writing a register pointer first.
+
+    Devices with a pointer register return data from the register last pointed to.
+
+    :param smbus_ref: smbus object
+    :param address: I2C address of device
+    :param length: number of bytes to read
+    :return: list of bytes read
+    :raises: NotImplementedError if multiple bytes are requested without i2c_rdwr support
+    """
+    msg_type = i2c_msg_type(smbus_ref)
+    if msg_type is None:
+        if length != 1:
+            raise NotImplementedError('Multiple byte read requires i2c_rdwr support.')
+        return [smbus_ref.read_byte(address)]
+    read = msg_type.read(address, length)
+    smbus_ref.i2c_rdwr(read)
+    return list(read)
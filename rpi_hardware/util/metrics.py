@@ -0,0 +1,186 @@
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from time import perf_counter
+
+from .i2c import i2c_msg_type
+
+# SMBus method: (has register argument, bytes transferred after address and register, from args and result)
+SMBUS_TRANSACTIONS = {
+    'write_quick': (False, lambda args, result: 0),
+    'read_byte': (False, lambda args, result: 1),
+    'write_byte': (False, lambda args, result: 1),
+    'read_byte_data': (True, lambda args, result: 1),
+    'write_byte_data': (True, lambda args, result: 1),
+    'read_word_data': (True, lambda args, result: 2),
+    'write_word_data': (True, lambda args, result: 2),
+    'process_call': (True, lambda args, result: 4),
+    'read_block_data': (True, lambda args, result: len(result)),
+    'write_block_data': (True, lambda args, result: len(args[2])),
+    'block_process_call': (True, lambda args, result: len(args[2]) + len(result)),
+    'read_i2c_block_data': (True, lambda args, result: len(result)),
+    'write_i2c_block_data': (True, lambda args, result: len(args[2])),
+}
+
+# GPIO methods timed and counted per pin
+GPIO_OPERATIONS = ('setup', 'output', 'input')
+
+# Upper bounds of latency histogram buckets in seconds, a last bucket holds anything slower
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+OperationStats = namedtuple('OperationStats', 'count bytes errors seconds histogram')
+
+
+class _Stats(object):
+    __slots__ = ('count', 'bytes', 'errors', 'seconds', 'histogram')
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.bytes = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.histogram = [0] * bucket_count
+
+    def freeze(self):
+        return OperationStats(self.count, self.bytes, self.errors, self.seconds, tuple(self.histogram))
+
+
+class _Metered(object):
+    """ Counts and latency histograms per key, shared by the metered proxies. """
+
+    _clock = staticmethod(perf_counter)
+
+    def __init__(self, wrapped, buckets):
+        self._wrapped = wrapped
+        self.buckets = tuple(buckets)
+        if list(self.buckets) != sorted(self.buckets):
+            raise ValueError('buckets must be in increasing order.')
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on proxy, so everything not metered goes straight through
+        return getattr(self._wrapped, name)
+
+    def _record(self, key, start, byte_count, error):
+        elapsed = self._clock() - start
+        bucket = bisect_left(self.buckets, elapsed)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _Stats(len(self.buckets) + 1)
+            stats.count += 1
+            stats.bytes += byte_count
+            stats.errors += error
+            stats.seconds += elapsed
+            stats.histogram[bucket] += 1
+
+    def snapshot(self):
+        """
+        Copy of statistics so far.
+
+        histogram has a count for each bucket upper bound in buckets, then one for slower operations.
+
+        :return: dict of key: OperationStats
+        """
+        with self._lock:
+            return {key: stats.freeze() for key, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class MeteredSMBus(_Metered):
+    """
+    Wraps an smbus object to count transactions, bytes and latency for each device address and register.
+
+    Give it to drivers in place of the smbus object.  snapshot is keyed by (address, register),
+    register is None for transactions without one, such as read_byte or i2c_rdwr.
+    """
+
+    def __init__(self, smbus_ref, buckets=DEFAULT_BUCKETS):
+        """
+        :param smbus_ref: smbus object to wrap
+        :param buckets: latency histogram bucket upper bounds in seconds, increasing
+        """
+        super().__init__(smbus_ref, buckets)
+        for name, (has_register, byte_count) in SMBUS_TRANSACTIONS.items():
+            if hasattr(smbus_ref, name):
+                setattr(self, name, self._metered(getattr(smbus_ref, name), has_register, byte_count))
+        if hasattr(smbus_ref, 'i2c_rdwr'):
+            self.i2c_rdwr = self._i2c_rdwr
+
+    @property
+    def i2c_msg(self):
+        return i2c_msg_type(self._wrapped)
+
+    def _metered(self, method, has_register, byte_count):
+        def _transaction(address, *args):
+            key = (address, args[0] if has_register else None)
+            start = self._clock()
+            try:
+                result = method(address, *args)
+            except Exception:
+                self._record(key, start, 0, True)
+                raise
+            self._record(key, start, byte_count((address,) + args, result), False)
+            return result
+        return _transaction
+
+    def _i2c_rdwr(self, *msgs):
+        start = self._clock()
+        key = (msgs[0].addr, None) if msgs else (None, None)
+        try:
+            self._wrapped.i2c_rdwr(*msgs)
+        except Exception:
+            self._record(key, start, 0, True)
+            raise
+        self._record(key, start, sum(len(msg) for msg in msgs), False)
+
+    def by_address(self):
+        """
+        Statistics totalled for each address, to find the devices using most of the bus.
+
+        :return: dict of address: OperationStats
+        """
+        totals = {}
+        for (address, _), stats in self.snapshot().items():
+            if address in totals:
+                total = totals[address]
+                stats = OperationStats(total.count + stats.count, total.bytes + stats.bytes,
+                                       total.errors + stats.errors, total.seconds + stats.seconds,
+                                       tuple(a + b for a, b in zip(total.histogram, stats.histogram)))
+            totals[address] = stats
+        return totals
+
+
+class MeteredGPIO(_Metered):
+    """
+    Wraps a GPIO object to count setup, output and input calls and latency for each pin.
+
+    snapshot is keyed by (method name, pin).  Constants such as OUT and other methods pass through.
+    """
+
+    def __init__(self, gpio_ref, buckets=DEFAULT_BUCKETS):
+        """
+        :param gpio_ref: RPi.GPIO module or mocked GPIO object to wrap
+        :param buckets: latency histogram bucket upper bounds in seconds, increasing
+        """
+        super().__init__(gpio_ref, buckets)
+        for name in GPIO_OPERATIONS:
+            setattr(self, name, self._metered(name, getattr(gpio_ref, name)))
+
+    def _metered(self, name, method):
+        def _operation(pin, *args, **kwargs):
+            # RPi.GPIO accepts a list of pins for setup and output
+            key = (name, tuple(pin) if isinstance(pin, (list, tuple)) else pin)
+            start = self._clock()
+            try:
+                result = method(pin, *args, **kwargs)
+            except Exception:
+                self._record(key, start, 0, True)
+                raise
+            self._record(key, start, 0, False)
+            return result
+        return _operation
@@ -0,0 +1,256 @@
+import struct
+import threading
+from collections import namedtuple
+from time import perf_counter
+
+from .i2c import i2c_msg_type
+from .metrics import SMBUS_TRANSACTIONS
+
+# Operation codes in log, append only so old logs stay readable
+OPERATIONS = ('write_quick', 'read_byte', 'write_byte', 'read_byte_data', 'write_byte_data',
+              'read_word_data', 'write_word_data', 'process_call', 'read_block_data', 'write_block_data',
+              'block_process_call', 'read_i2c_block_data', 'write_i2c_block_data', 'i2c_rdwr',
+              'setup', 'output', 'input')
+_OPERATION_CODES = {name: code for code, name in enumerate(OPERATIONS)}
+
+# SMBus method: (index of written value in args, 'byte', 'word' or 'list')
+_WRITTEN = {
+    'write_byte': (1, 'byte'),
+    'write_byte_data': (2, 'byte'),
+    'write_word_data': (2, 'word'),
+    'process_call': (2, 'word'),
+    'write_block_data': (2, 'list'),
+    'block_process_call': (2, 'list'),
+    'write_i2c_block_data': (2, 'list'),
+}
+
+# SMBus method: kind of value returned
+RESULTS = {
+    'read_byte': 'byte',
+    'read_byte_data': 'byte',
+    'read_word_data': 'word',
+    'process_call': 'word',
+    'read_block_data': 'list',
+    'block_process_call': 'list',
+    'read_i2c_block_data': 'list',
+}
+
+_MAGIC = b'RPTR\x01'
+# timestamp, channel, operation, address or pin, register (-1 for none), errno (0 for success), data length
+_RECORD = struct.Struct('<dBBHhBH')
+
+TrafficRecord = namedtuple('TrafficRecord', 'timestamp channel operation address register errno written read')
+
+
+def encode_value(value, kind):
+    """ Bytes for a transferred value, words are little endian as SMBus returns them. """
+    if kind == 'byte':
+        return bytes((value,))
+    if kind == 'word':
+        return value.to_bytes(2, 'little')
+    return bytes(value)
+
+
+def decode_value(data, kind):
+    if kind == 'byte':
+        return data[0]
+    if kind == 'word':
+        return int.from_bytes(data, 'little')
+    return list(data)
+
+
+def smbus_written(name, args):
+    """ Bytes written by an SMBus transaction, args start with address. """
+    if name not in _WRITTEN:
+        return b''
+    index, kind = _WRITTEN[name]
+    return encode_value(args[index], kind)
+
+
+def gpio_written(name, args, kwargs):
+    """ Bytes recorded for a GPIO call, args start with pin.  None is recorded as 0xff. """
+    if name == 'setup':
+        initial = kwargs.get('initial', args[2] if len(args) > 2 else None)
+        pull_up_down = kwargs.get('pull_up_down', args[3] if len(args) > 3 else None)
+        return bytes(0xff if value is None else value for value in (args[1], initial, pull_up_down))
+    if name == 'output':
+        return bytes((args[1],))
+    return b''
+
+
+def read_log(path):
+    """
+    Read a log written by TrafficRecorder.
+
+    A record cut short, as left by a recorder that did not close, ends the log.
+
+    :param path: log file
+    :return: generator of TrafficRecord, in recorded order
+    :raises: ValueError if file is not a traffic log
+    """
+    with open(path, 'rb') as log_file:
+        if log_file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError('{} is not a traffic log.'.format(path))
+        while True:
+            header = log_file.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            timestamp, channel, code, address, register, error, length = _RECORD.unpack(header)
+            data = log_file.read(length)
+            if not data or len(data) < length:
+                return
+            written_length = data[0]
+            yield TrafficRecord(timestamp, channel, OPERATIONS[code], address,
+                                None if register < 0 else register, error,
+                                data[1:1 + written_length], data[1 + written_length:])
+
+
+class TrafficRecorder(object):
+    """
+    Records SMBus and GPIO traffic to a compact binary log, for replay with mocked.replay.
+
+    Wrap each smbus or GPIO object given to drivers with smbus or gpio.  Every transaction is written
+    with its time since recording started, the bytes written and the bytes read, or the errno of a
+    failed transaction.  Each wrapped object gets its own channel number, so several buses can be
+    recorded to one log and replayed separately.
+
+    Records are flushed to the file as they are written, so a log is readable while recording and
+    nothing is lost if the process ends without close.  With flush_interval, records are flushed
+    by the first one written that many seconds after the last flush, saving system calls on busy buses.
+    """
+
+    _clock = staticmethod(perf_counter)
+
+    def __init__(self, path, flush_interval=0.0):
+        """
+        :param path: log file to write, replaced if it exists
+        :param flush_interval: seconds records may wait in buffer before flushing, 0 flushes every record
+        """
+        if flush_interval < 0:
+            raise ValueError('flush_interval must not be negative.')
+        self._file = open(path, 'wb')
+        self._file.write(_MAGIC)
+        self._file.flush()
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._start = self._clock()
+        self._flushed = self._start
+        self._channels = 0
+
+    def _next_channel(self, channel):
+        if channel is None:
+            channel = self._channels
+        self._channels = max(self._channels, channel + 1)
+        return channel
+
+    def smbus(self, smbus_ref, channel=None):
+        """
+        :param smbus_ref: smbus object to record
+        :param channel: channel number 0-255, defaults to next unused
+        :return: RecordingSMBus to give drivers in place of smbus_ref
+        """
+        return RecordingSMBus(self, smbus_ref, self._next_channel(channel))
+
+    def gpio(self, gpio_ref, channel=None):
+        """
+        :param gpio_ref: RPi.GPIO module or mocked GPIO object to record
+        :param channel: channel number 0-255, defaults to next unused
+        :return: RecordingGPIO to give drivers in place of gpio_ref
+        """
+        return RecordingGPIO(self, gpio_ref, self._next_channel(channel))
+
+    def record(self, start, channel, name, address, register, error, written, read):
+        """ Write a transaction that began at start, which should come from TrafficRecorder._clock. """
+        data = bytes((len(written),)) + written + read
+        header = _RECORD.pack(start - self._start, channel, _OPERATION_CODES[name], address,
+                              -1 if register is None else register, error, len(data))
+        with self._lock:
+            self._file.write(header + data)
+            now = self._clock()
+            if now - self._flushed >= self.flush_interval:
+                self._file.flush()
+                self._flushed = now
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Recording(object):
+    def __init__(self, recorder, wrapped, channel):
+        self._recorder = recorder
+        self._wrapped = wrapped
+        self.channel = channel
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+
+class RecordingSMBus(_Recording):
+    """ Wraps an smbus object, recording every transaction.  Created with TrafficRecorder.smbus. """
+
+    def __init__(self, recorder, smbus_ref, channel):
+        super().__init__(recorder, smbus_ref, channel)
+        for name, (has_register, _) in SMBUS_TRANSACTIONS.items():
+            if hasattr(smbus_ref, name):
+                setattr(self, name, self._recorded(name, getattr(smbus_ref, name), has_register))
+        if hasattr(smbus_ref, 'i2c_rdwr'):
+            self.i2c_rdwr = self._i2c_rdwr
+
+    @property
+    def i2c_msg(self):
+        return i2c_msg_type(self._wrapped)
+
+    def _recorded(self, name, method, has_register):
+        kind = RESULTS.get(name)
+
+        def _transaction(address, *args):
+            register = args[0] if has_register else None
+            written = smbus_written(name, (address,) + args)
+            start = self._recorder._clock()
+            try:
+                result = method(address, *args)
+            except OSError as error:
+                self._recorder.record(start, self.channel, name, address, register, error.errno or 5, written, b'')
+                raise
+            read = b'' if kind is None else encode_value(result, kind)
+            self._recorder.record(start, self.channel, name, address, register, 0, written, read)
+            return result
+        return _transaction
+
+    def _i2c_rdwr(self, *msgs):
+        address = msgs[0].addr if msgs else 0
+        written = b''.join(bytes(msg) for msg in msgs if not msg.flags & 1)
+        start = self._recorder._clock()
+        try:
+            self._wrapped.i2c_rdwr(*msgs)
+        except OSError as error:
+            self._recorder.record(start, self.channel, 'i2c_rdwr', address, None, error.errno or 5, written, b'')
+            raise
+        read = b''.join(bytes(msg) for msg in msgs if msg.flags & 1)
+        self._recorder.record(start, self.channel, 'i2c_rdwr', address, None, 0, written, read)
+
+
+class RecordingGPIO(_Recording):
+    """ Wraps a GPIO object, recording setup, output and input by pin.  Created with TrafficRecorder.gpio. """
+
+    def __init__(self, recorder, gpio_ref, channel):
+        super().__init__(recorder, gpio_ref, channel)
+        for name in ('setup', 'output', 'input'):
+            setattr(self, name, self._recorded(name, getattr(gpio_ref, name)))
+
+    def _recorded(self, name, method):
+        def _operation(pin, *args, **kwargs):
+            written = gpio_written(name, (pin,) + args, kwargs)
+            start = self._recorder._clock()
+            result = method(pin, *args, **kwargs)
+            read = bytes((result,)) if name == 'input' else b''
+            self._recorder.record(start, self.channel, name, pin, None, 0, written, read)
+            return result
+        return _operation
@@ -0,0 +1,59 @@
+from array import array
+
+
+class RingBuffer(object):
+    """
+    Fixed capacity buffer of records, oldest overwritten when full.
+
+    Each field is stored in its own preallocated array, so appending never allocates and
+    a column can be handed to array or NumPy code without conversion.
+    """
+
+    def __init__(self, capacity, fields):
+        """
+        :param capacity: number of records held
+        :param fields: sequence of (name, array typecode) for each field of a record
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1.')
+        self.capacity = capacity
+        self.names = tuple(name for name, _ in fields)
+        self._columns = [array(typecode, [0]) * capacity for _, typecode in fields]
+        self._next = 0
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def dropped(self):
+        """ Records overwritten before being read out. """
+        return max(0, self.total - self.capacity)
+
+    def append(self, *values):
+        """ Add record, with a value for each field in order. """
+        index = self._next
+        for column, value in zip(self._columns, values):
+            column[index] = value
+        self._next = (index + 1) % self.capacity
+        self.total += 1
+
+    def clear(self):
+        self._next = 0
+        self.total = 0
+
+    def column(self, name):
+        """
+        Copy of one field for all records, oldest first.
+
+        :param name: field name
+        :return: array of field values
+        """
+        column = self._columns[self.names.index(name)]
+        if self.total < self.capacity:
+            return column[:self._next]
+        return column[self._next:] + column[:self._next]
+
+    def __iter__(self):
+        """ Records as tuples, oldest first. """
+        return zip(*(self.column(name) for name in self.names))
@@ -0,0 +1,67 @@
+from collections import deque, namedtuple
+from time import perf_counter
+
+TraceEvent = namedtuple('TraceEvent', 'timestamp device address register raw value duration')
+
+# Active Tracer, or None when tracing is disabled.  Drivers check this once per operation,
+# so disabled tracing costs a single attribute lookup.
+tracer = None
+
+
+class Tracer(object):
+    """
+    Records driver register operations into an in-memory ring buffer.
+
+    Once full, the oldest events are dropped.  Timestamps and durations are time.perf_counter seconds.
+    """
+
+    clock = staticmethod(perf_counter)
+
+    def __init__(self, capacity=10000):
+        """
+        :param capacity: number of events kept
+        """
+        self.events = deque(maxlen=capacity)
+
+    def record(self, device, address, register, raw, value, start):
+        """
+        Record an operation that began at start, which should come from Tracer.clock.
+
+        :param device: driver name
+        :param address: I2C address of device
+        :param register: register read or written
+        :param raw: raw register value
+        :param value: decoded value, None for writes
+        :param start: clock value when operation started
+        """
+        self.events.append(TraceEvent(start, device, address, register, raw, value, self.clock() - start))
+
+    def clear(self):
+        self.events.clear()
+
+    def snapshot(self):
+        """ List of recorded events, oldest first. """
+        return list(self.events)
+
+
+def enable(capacity=10000):
+    """
+    Start tracing driver operations.
+
+    :param capacity: number of events kept
+    :return: Tracer collecting events
+    """
+    global tracer
+    tracer = Tracer(capacity)
+    return tracer
+
+
+def disable():
+    """
+    Stop tracing.
+
+    :return: Tracer that was collecting events, or None
+    """
+    global tracer
+    stopped, tracer = tracer, None
+    return stopped
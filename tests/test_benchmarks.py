@@ -0,0 +1,26 @@
+from rpi_hardware import benchmarks
+
+
+def test_every_benchmark_runs():
+    results = benchmarks.run(repeat=1, min_time=0)
+    assert list(results) == list(benchmarks.BENCHMARKS)
+    assert all(result['seconds'] > 0 for result in results.values())
+
+
+def test_save_load_compare(tmpdir):
+    path = str(tmpdir.join('baseline.json'))
+    benchmarks.save({'a': {'seconds': 1.0, 'number': 1}, 'b': {'seconds': 2.0, 'number': 1}}, path)
+    baseline = benchmarks.load(path)
+    results = {'a': {'seconds': 1.05, 'number': 1}, 'b': {'seconds': 2.5, 'number': 1},
+               'c': {'seconds': 9.0, 'number': 1}}
+    assert benchmarks.compare(baseline, results, tolerance=0.1) == [('b', 2.0, 2.5, 1.25)]
+
+
+def test_main_compare_exit_code(tmpdir, mocker, capsys):
+    path = str(tmpdir.join('baseline.json'))
+    mocker.patch.object(benchmarks, 'run', return_value={'crc8_value': {'seconds': 1.0, 'number': 1}})
+    assert benchmarks.main(['crc8_value', '--save', path]) == 0
+    assert benchmarks.main(['crc8_value', '--compare', path]) == 0
+    benchmarks.run.return_value = {'crc8_value': {'seconds': 2.0, 'number': 1}}
+    assert benchmarks.main(['crc8_value', '--compare', path]) == 1
+    assert 'Regression: crc8_value' in capsys.readouterr().out
@@ -0,0 +1,57 @@
+from array import array
+
+import pytest
+
+from rpi_hardware import TMP275
+from rpi_hardware.util.convert import (
+    ina219_bus_to_millivolts,
+    ina219_shunt_to_millivolts,
+    tmp275_to_celcius,
+    tmp275_word_to_celcius,
+    twos_complement,
+)
+
+TEMPERATURES = [-55, -25.0625, -0.25, 0, 0.0625, 25, 50.5, 127.9375]
+
+
+def test_twos_complement():
+    assert twos_complement(0x7fff) == 32767
+    assert twos_complement(0x8000) == -32768
+    assert twos_complement(0xfff, 12) == -1
+
+
+@pytest.mark.parametrize("bit_resolution,expected", [
+    (12, 25.0625),
+    (11, 25.0),
+    (9, 25.0),
+])
+def test_tmp275_resolution_mask(bit_resolution, expected):
+    assert tmp275_word_to_celcius(0x1910, bit_resolution) == expected
+
+
+def test_tmp275_bulk_matches_driver():
+    words = array('H', [TMP275._temp_to_bit_int(temp) for temp in TEMPERATURES])
+    assert list(tmp275_to_celcius(words)) == TEMPERATURES
+    assert list(tmp275_to_celcius(list(words))) == TEMPERATURES
+
+    swapped = array('H', words)
+    swapped.byteswap()
+    assert list(tmp275_to_celcius(swapped, swap_bytes=True)) == TEMPERATURES
+    # Input is not modified
+    assert list(tmp275_to_celcius(words)) == TEMPERATURES
+
+
+def test_ina219_bulk():
+    assert list(ina219_shunt_to_millivolts([0x0fa0, 0xf060, 0x7d00])) == [40.0, -40.0, 320.0]
+    assert list(ina219_bus_to_millivolts([0x5dc2, 0x5dc3, 0xfff8])) == [12000, 12000, 32764]
+    assert list(ina219_shunt_to_millivolts(array('H', [0x60f0]), swap_bytes=True)) == [-40.0]
+
+
+def test_numpy_bulk():
+    numpy = pytest.importorskip('numpy')
+    words = numpy.array([TMP275._temp_to_bit_int(temp) for temp in TEMPERATURES], dtype=numpy.uint16)
+    assert tmp275_to_celcius(words).tolist() == TEMPERATURES
+    assert tmp275_to_celcius(words.byteswap(), swap_bytes=True).tolist() == TEMPERATURES
+    shunt = numpy.array([0x0fa0, 0xf060], dtype=numpy.uint16)
+    assert ina219_shunt_to_millivolts(shunt).tolist() == [40.0, -40.0]
+    assert ina219_bus_to_millivolts(numpy.array([0x5dc2], dtype=numpy.uint16)).tolist() == [12000]
@@ -1,5 +1,9 @@
+from array import array
+
 import pytest
-from rpi_hardware.util.crc import crc8_value
+
+from rpi_hardware.util.crc import crc8_value, Crc8, _add_to_crc8
+from rpi_hardware.util.crc import CrcModel, CRC8_MAXIM, CRC8_SENSIRION, CRC8_SMBUS
 
 
 @pytest.mark.parametrize("byte_list,crc_value", [
@@ -271,3 +275,81 @@ def test_check_crc8_single_bytes(byte_list, crc_value):
 ])
 def test_check_crc8_byte_lists(byte_list, crc_value):
     assert crc8_value(byte_list) == crc_value
+
+
+def test_crc8_table_matches_bitwise():
+    for value in range(256):
+        assert crc8_value([value]) == _add_to_crc8(value, 0)
+        assert crc8_value([value - 256]) == _add_to_crc8(value - 256, 0)
+
+
+@pytest.mark.parametrize("data", [
+    bytes([212, 54, 197, 23, 76, 18]),
+    bytearray([212, 54, 197, 23, 76, 18]),
+    memoryview(bytes([212, 54, 197, 23, 76, 18])),
+    memoryview(array('H', [0x36d4, 0x17c5, 0x124c])),
+])
+def test_crc8_buffer_types(data):
+    assert crc8_value(data) == 127
+
+
+def test_crc8_incremental():
+    data = bytes(range(256)) * 4
+    crc = Crc8(data[:100])
+    crc.update(memoryview(data)[100:700]).update(list(data[700:]))
+    assert crc.value == crc8_value(data)
+    crc.reset()
+    assert crc.value == 0
+
+
+@pytest.mark.parametrize("model,check", [
+    (CRC8_MAXIM, 0xA1),
+    (CRC8_SENSIRION, 0xF7),
+    (CRC8_SMBUS, 0xF4),
+    (CrcModel(16, 0x1021, init=0xFFFF, name='CRC-16/CCITT-FALSE'), 0x29B1),
+    (CrcModel(16, 0x8005, refin=True, refout=True, name='CRC-16/ARC'), 0xBB3D),
+    (CrcModel(32, 0x04C11DB7, init=0xFFFFFFFF, refin=True, refout=True, xorout=0xFFFFFFFF), 0xCBF43926),
+    (CrcModel(16, 0x1021, refin=True, name='refin only'), 0x9184),
+])
+def test_crc_model_check_values(model, check):
+    assert model.value(b'123456789') == check
+    assert model.value([ord(c) for c in '123456789']) == check
+
+
+def test_crc8_maxim_matches_crc8_value():
+    data = bytes(range(256))
+    assert CRC8_MAXIM.value(data) == crc8_value(data)
+
+
+def test_crc_tables_shared():
+    assert CrcModel(8, 0x31, init=0xFF).table is CRC8_SENSIRION.table
+    with pytest.raises(ValueError):
+        CrcModel(4, 0x3)
+
+
+def test_check_frames():
+    frames = bytearray()
+    for value in range(20):
+        payload = value.to_bytes(2, 'big')
+        frames += payload + bytes([CRC8_SENSIRION.value(payload)])
+    frames[4] ^= 0x10
+    assert CRC8_SENSIRION.check_frames(bytes(frames), 3) == [True, False] + [True] * 18
+    with pytest.raises(ValueError):
+        CRC8_SENSIRION.check_frames(bytes(frames[:-1]), 3)
+
+
+def test_check_frames_little_endian_crc16():
+    model = CrcModel(16, 0x8005, refin=True, refout=True)
+    frame = b'1234' + model.value(b'1234').to_bytes(2, 'little')
+    assert model.check_frames(frame * 3, 6, byteorder='little') == [True] * 3
+    assert model.check_frames(frame * 3, 6) == [False] * 3
+
+
+def test_check_frames_numpy():
+    numpy = pytest.importorskip('numpy')
+    payloads = numpy.arange(200, dtype=numpy.uint8).reshape(100, 2)
+    crcs = [CRC8_SENSIRION.value(bytes(payload)) for payload in payloads]
+    frames = numpy.hstack([payloads, numpy.array(crcs, dtype=numpy.uint8).reshape(100, 1)])
+    frames[7, 2] ^= 0x01
+    result = CRC8_SENSIRION.check_frames(frames.reshape(-1), 3)
+    assert result.tolist() == [index != 7 for index in range(100)]
@@ -0,0 +1,81 @@
+import pytest
+
+from rpi_hardware import DS28CM00, INA219, TMP275
+from rpi_hardware.discovery import PresenceMap, probe, scan_bus, scan_buses
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeDS28CM00, FakeINA219, FakeTMP275
+
+
+@pytest.fixture
+def buses():
+    bus_1 = smbus.SMBus(1)
+    FakeTMP275(bus_1, 0x48)
+    FakeTMP275(bus_1, 0x4b)
+    FakeINA219(bus_1, 0x40)
+    FakeDS28CM00(bus_1, [1, 2, 3, 4, 5, 6])
+    bus_2 = smbus.SMBus(2)
+    FakeINA219(bus_2, 0x45)
+    return {1: bus_1, 2: bus_2}
+
+
+def test_probe(buses):
+    assert probe(buses[1], 0x48) is True
+    assert probe(buses[1], 0x49) is False
+
+
+def test_scan_bus_probes_only_declared_addresses(buses, mocker):
+    quick = mocker.spy(buses[1], 'write_quick')
+    found = scan_bus(buses[1], (TMP275, INA219))
+    assert found == {0x40: 'INA219', 0x48: 'TMP275', 0x4b: 'TMP275'}
+    probed = sorted(call[0][0] for call in quick.call_args_list)
+    assert probed == list(range(0x40, 0x50))
+
+
+def test_probe_reads_eeprom_range(buses, mocker):
+    quick = mocker.spy(buses[1], 'write_quick')
+    read = mocker.spy(buses[1], 'read_byte')
+    assert probe(buses[1], 0x50) is True
+    assert probe(buses[1], 0x33) is False
+    assert quick.call_count == 0
+    assert [call[0][0] for call in read.call_args_list] == [0x50, 0x33]
+
+
+def test_ina219_told_apart_from_tmp275():
+    bus = smbus.SMBus(3)
+    FakeTMP275(bus, 0x48, temperature=21.0)
+    FakeTMP275(bus, 0x49, temperature=-0.5)
+    FakeINA219(bus, 0x4c)
+    configured = FakeINA219(bus, 0x4d)
+    INA219(bus, address=0x4d, operating_mode=0x7)
+    assert scan_bus(bus) == {0x48: 'TMP275', 0x49: 'TMP275', 0x4c: 'INA219', 0x4d: 'INA219'}
+    assert configured._registers[0x00] & 0x7 == 0x7
+
+
+def test_scan_buses(buses):
+    presence = scan_buses(buses)
+    assert presence.buses() == [1, 2]
+    assert presence.addresses(1, TMP275) == [0x48, 0x4b]
+    assert presence.addresses(1, DS28CM00) == [0x50]
+    assert presence[2] == {0x45: 'INA219'}
+
+
+def test_build_drivers(buses):
+    drivers = scan_buses(buses).build_drivers(buses)
+    assert isinstance(drivers[1][0x48], TMP275)
+    assert isinstance(drivers[1][0x40], INA219)
+    assert drivers[1][0x50].serial_number == hex(0x010203040506)
+    assert drivers[2][0x45].address == 0x45
+
+
+def test_save_load_and_lazy_revalidate(buses, tmpdir, mocker):
+    path = str(tmpdir.join('presence.json'))
+    scan_buses(buses).save(path)
+    loaded = PresenceMap.load(path)
+    assert loaded[1] == {0x40: 'INA219', 0x48: 'TMP275', 0x4b: 'TMP275', 0x50: 'DS28CM00'}
+
+    # Device removed since save is dropped, only recorded addresses are probed.
+    del buses[2]._devices[0x45]
+    quick = mocker.spy(buses[2], 'write_quick')
+    assert loaded.build_drivers({2: buses[2]}) == {2: {}}
+    quick.assert_called_once_with(0x45)
+    assert loaded.addresses(2) == []
@@ -1,7 +1,9 @@
+import errno
+
 import pytest
 from rpi_hardware.mocked import smbus
 from rpi_hardware.mocked import FakeDS28CM00
-from rpi_hardware import DS28CM00
+from rpi_hardware import DS28CM00, DS28CM00IdentityCache
 
 
 @pytest.fixture
@@ -28,3 +30,133 @@ def test_straight_read(smb):
     for byte in serial_number:
         serial = (serial << 8) + byte
     assert hex(serial) == rds.serial_number
+
+
+def test_read_is_single_block_transaction(smb, mocker):
+    FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    block_read = mocker.spy(smb, 'read_i2c_block_data')
+    byte_read = mocker.spy(smb, 'read_byte')
+    rds = DS28CM00(smb)
+    assert rds.serial_number == hex(0x010203040506)
+    block_read.assert_called_once_with(DS28CM00._ADDRESS, 0x00, 8)
+    assert byte_read.call_count == 0
+
+
+def test_transient_crc_errors_retried(smb, mocker):
+    fds = FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    fds.inject_bit_errors(2)
+    block_read = mocker.spy(smb, 'read_i2c_block_data')
+    assert DS28CM00(smb, retries=2).serial_number == hex(0x010203040506)
+    assert block_read.call_count == 3
+
+
+def test_persistent_crc_errors_raise(smb):
+    fds = FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    fds.inject_bit_errors(3)
+    with pytest.raises(ValueError):
+        DS28CM00(smb, retries=2).serial_number
+
+
+def test_retry_budget_bounds_latency(smb, mocker):
+    fds = FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    fds.inject_bit_errors(1)
+    mocker.patch.object(DS28CM00, '_clock', side_effect=[0.0, 1.0])
+    with pytest.raises(ValueError):
+        DS28CM00(smb, retries=5, retry_budget=0.5).serial_number
+
+
+def test_byte_read_fallback(smb, mocker):
+    FakeDS28CM00(smb, [9, 8, 7, 6, 5, 4])
+    mocker.patch.object(smb, 'read_i2c_block_data', side_effect=IOError(errno.EOPNOTSUPP, 'Not supported'))
+    byte_read = mocker.spy(smb, 'read_byte')
+    rds = DS28CM00(smb)
+    assert rds.serial_number == hex(0x090807060504)
+    assert byte_read.call_count == 8
+
+
+def test_missing_device_not_hidden_by_fallback():
+    with pytest.raises(IOError):
+        DS28CM00(smbus.SMBus(1)).serial_number
+
+
+def test_identity_cache_cold_read_stores(smb, tmpdir):
+    path = str(tmpdir.join('identity.json'))
+    FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    cache = DS28CM00IdentityCache(path)
+    assert cache.serial_number(1, DS28CM00(smb)) == hex(0x010203040506)
+    entry = DS28CM00IdentityCache(path).get(1)
+    assert entry['serial'] == hex(0x010203040506)
+    assert entry['crc'] == DS28CM00(smb).crc
+
+
+def test_identity_cache_returns_cached_then_confirms(smb, tmpdir, mocker):
+    path = str(tmpdir.join('identity.json'))
+    FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    DS28CM00IdentityCache(path).serial_number(1, DS28CM00(smb))
+
+    callback = mocker.Mock()
+    cache = DS28CM00IdentityCache(path, callback)
+    assert cache.serial_number(1, DS28CM00(smb)) == hex(0x010203040506)
+    cache.wait(1)
+    callback.assert_not_called()
+    assert cache.get(1)['serial'] == hex(0x010203040506)
+
+
+def test_identity_cache_mismatch_replaces_entry(tmpdir, mocker):
+    path = str(tmpdir.join('identity.json'))
+    old_bus = smbus.SMBus(1)
+    FakeDS28CM00(old_bus, [1, 2, 3, 4, 5, 6])
+    DS28CM00IdentityCache(path).serial_number(1, DS28CM00(old_bus))
+
+    new_bus = smbus.SMBus(1)
+    FakeDS28CM00(new_bus, [6, 5, 4, 3, 2, 1])
+    callback = mocker.Mock()
+    cache = DS28CM00IdentityCache(path, callback)
+    assert cache.serial_number(1, DS28CM00(new_bus)) == hex(0x010203040506)
+    cache.wait(1)
+    callback.assert_called_once_with(1, DS28CM00._ADDRESS, hex(0x010203040506), hex(0x060504030201))
+    assert DS28CM00IdentityCache(path).get(1)['serial'] == hex(0x060504030201)
+
+
+def test_identity_cache_failed_read_invalidates(smb, tmpdir, mocker):
+    path = str(tmpdir.join('identity.json'))
+    fds = FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    DS28CM00IdentityCache(path).serial_number(1, DS28CM00(smb))
+
+    fds.inject_bit_errors(10)
+    callback = mocker.Mock()
+    cache = DS28CM00IdentityCache(path, callback)
+    cache.serial_number(1, DS28CM00(smb, retries=1))
+    cache.wait(1)
+    callback.assert_called_once_with(1, DS28CM00._ADDRESS, hex(0x010203040506), None)
+    assert DS28CM00IdentityCache(path).get(1) is None
+
+
+def test_identity_cache_keeps_entry_on_bus_error(smb, tmpdir, mocker):
+    path = str(tmpdir.join('identity.json'))
+    FakeDS28CM00(smb, [1, 2, 3, 4, 5, 6])
+    DS28CM00IdentityCache(path).serial_number(1, DS28CM00(smb))
+
+    callback = mocker.Mock()
+    cache = DS28CM00IdentityCache(path, callback)
+    ds28cm00 = DS28CM00(smb)
+    mocker.patch.object(smb, 'read_i2c_block_data', side_effect=IOError(errno.EREMOTEIO, 'Remote I/O error'))
+    assert cache.serial_number(1, ds28cm00) == hex(0x010203040506)
+    cache.wait(1)
+    callback.assert_called_once_with(1, DS28CM00._ADDRESS, hex(0x010203040506), None)
+    assert DS28CM00IdentityCache(path).get(1)['serial'] == hex(0x010203040506)
+
+    # Read is tried again on next access
+    mocker.stopall()
+    assert cache.serial_number(1, ds28cm00) == hex(0x010203040506)
+    cache.wait(1)
+    assert callback.call_count == 1
+    assert ds28cm00.crc is not None
+
+
+def test_identity_cache_ignores_corrupt_entry(tmpdir):
+    path = tmpdir.join('identity.json')
+    path.write('{"1:0x50": {"serial": "0x10203040506", "crc": 0, "timestamp": 0}}')
+    assert DS28CM00IdentityCache(str(path)).get(1) is None
+    with pytest.raises(ValueError):
+        DS28CM00IdentityCache(str(path)).store(1, 0x50, '0x10203040506', 0)
@@ -0,0 +1,47 @@
+import pytest
+
+from rpi_hardware.energy import EnergyIntegrator
+from rpi_hardware.ina219 import PowerSnapshot
+
+
+def test_constant_load_integration():
+    integrator = EnergyIntegrator()
+    assert integrator.summary() is None
+    for second in range(0, 3601, 60):
+        integrator.add(second, 0.5, 2.5)
+    assert integrator.energy_wh == pytest.approx(2.5)
+    assert integrator.charge_mah == pytest.approx(500)
+    summary = integrator.summary()
+    assert (summary.start, summary.end, summary.samples) == (0, 3600, 61)
+    assert summary.power_mean == pytest.approx(2.5)
+
+
+def test_trapezoid_and_running_stats():
+    integrator = EnergyIntegrator()
+    integrator.add(0, 0.0, 0.0)
+    integrator.add(36, 1.0, 10.0)
+    assert integrator.energy_wh == pytest.approx(0.05)
+    assert integrator.charge_mah == pytest.approx(5)
+    summary = integrator.summary()
+    assert (summary.power_min, summary.power_max, summary.current_mean) == (0.0, 10.0, 0.5)
+    with pytest.raises(ValueError):
+        integrator.add(35, 1.0, 10.0)
+
+
+def test_decimated_summaries(mocker):
+    callback = mocker.Mock()
+    integrator = EnergyIntegrator(interval=10, callback=callback)
+    summaries = integrator.consume((second, 1.0, second) for second in range(25))
+    assert [(s.start, s.end, s.samples) for s in summaries] == [(0, 10, 11), (10, 20, 10)]
+    assert callback.call_count == 2
+    assert sum(s.energy_wh for s in summaries) == pytest.approx(200 / 3600)
+    assert summaries[1].power_min == 11
+    assert summaries[1].power_max == 20
+
+
+def test_snapshot_and_voltages():
+    integrator = EnergyIntegrator()
+    integrator.add_snapshot(0, PowerSnapshot(50.0, 5000, 0.5, 2.5, 0, True))
+    integrator.add_voltages(3600, 50.0, 5000, 0.1)
+    assert integrator.energy_wh == pytest.approx(2.5)
+    assert integrator.charge_mah == pytest.approx(500)
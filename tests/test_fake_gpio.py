@@ -113,3 +113,31 @@ def test_falling_callback(bcm):
     GPIO.add_event_callback(6, GPIO.FALLING, func)
     GPIO.output(6, GPIO.LOW)
     func.assert_called_with()
+
+
+def test_add_event_detect(bcm):
+    func = mock.Mock()
+    GPIO.setup(17, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    assert GPIO.input(17) == GPIO.HIGH
+    GPIO.add_event_detect(17, GPIO.BOTH, callback=func)
+    GPIO._simulate_set_pin(17, GPIO.LOW)
+    func.assert_called_once_with(17)
+    GPIO._simulate_set_pin(17, GPIO.HIGH)
+    assert func.call_count == 2
+    GPIO.remove_event_detect(17)
+    GPIO._simulate_set_pin(17, GPIO.LOW)
+    assert func.call_count == 2
+
+
+def test_remove_event_detect_keeps_event_callbacks(bcm):
+    callback = mock.Mock()
+    detect = mock.Mock()
+    GPIO.setup(17, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+    # Nothing registered yet, silently ignored as RPi.GPIO does
+    GPIO.remove_event_detect(17)
+    GPIO.add_event_callback(17, GPIO.RISING, callback)
+    GPIO.add_event_detect(17, GPIO.RISING, callback=detect)
+    GPIO.remove_event_detect(17)
+    GPIO._simulate_set_pin(17, GPIO.HIGH)
+    callback.assert_called_once_with()
+    assert detect.call_count == 0
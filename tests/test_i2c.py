@@ -0,0 +1,60 @@
+import pytest
+
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeDS28CM00
+from rpi_hardware.util.i2c import i2c_msg_type, write_then_read, read_bytes
+
+SERIAL = [15, 45, 120, 255, 0, 192]
+
+
+class PlainSMBus(object):
+    """ Stands in for the original smbus module, which has no i2c_rdwr. """
+
+    def __init__(self, bus):
+        self._bus = bus
+
+    def read_byte(self, addr):
+        return self._bus.read_byte(addr)
+
+    def read_i2c_block_data(self, addr, register, length=32):
+        return self._bus.read_i2c_block_data(addr, register, length)
+
+
+@pytest.fixture
+def smb():
+    bus = smbus.SMBus(1)
+    FakeDS28CM00(bus, SERIAL)
+    return bus
+
+
+def test_i2c_msg_type(smb):
+    assert i2c_msg_type(smb) is smbus.i2c_msg
+    assert i2c_msg_type(PlainSMBus(smb)) is None
+
+
+def test_i2c_rdwr_fills_read_message(smb):
+    write = smbus.i2c_msg.write(FakeDS28CM00._ADDRESS, [0x01])
+    read = smbus.i2c_msg.read(FakeDS28CM00._ADDRESS, 6)
+    smb.i2c_rdwr(write, read)
+    assert list(read) == SERIAL
+    assert read.len == 6
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+def test_write_then_read(smb, wrap):
+    bus = PlainSMBus(smb) if wrap else smb
+    assert write_then_read(bus, FakeDS28CM00._ADDRESS, [0x01], 6) == SERIAL
+
+
+def test_write_then_read_multiple_bytes_needs_rdwr(smb):
+    with pytest.raises(ValueError):
+        write_then_read(PlainSMBus(smb), FakeDS28CM00._ADDRESS, [0x01, 0x02], 6)
+
+
+def test_read_bytes(smb):
+    smb.write_byte(FakeDS28CM00._ADDRESS, 0x03)
+    assert read_bytes(smb, FakeDS28CM00._ADDRESS, 2) == SERIAL[2:4]
+    plain = PlainSMBus(smb)
+    assert read_bytes(plain, FakeDS28CM00._ADDRESS, 1) == [SERIAL[4]]
+    with pytest.raises(NotImplementedError):
+        read_bytes(plain, FakeDS28CM00._ADDRESS, 2)
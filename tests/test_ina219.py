@@ -0,0 +1,284 @@
+import pytest
+
+from rpi_hardware import INA219
+from rpi_hardware.ina219 import INA219Sampler, configure_all, triggered_snapshot_all
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeINA219
+
+
+@pytest.fixture
+def ina():
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x41)
+    return fake, INA219(bus, address=0x41)
+
+
+def test_invalid_address():
+    with pytest.raises(ValueError):
+        INA219(smbus.SMBus(1), address=0x50)
+
+
+@pytest.mark.parametrize("shunt_mv", [12.5, -12.5, -320.0, 0])
+def test_shunt_voltage(ina, shunt_mv):
+    fake, ina219 = ina
+    fake.set_measurement(shunt_mv, 5000)
+    assert ina219.shunt_voltage() == shunt_mv
+
+
+def test_bus_voltage(ina):
+    fake, ina219 = ina
+    fake.set_measurement(1, 12004, overflow=True)
+    assert ina219.bus_voltage() == (12004, 1)
+
+
+def test_words_in_smbus_byte_order():
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x41)
+    ina219 = INA219(bus, address=0x41)
+    fake.set_measurement(10.0, 12000)
+    # Shunt register 0x03e8 arrives from SMBus read_word_data low byte first
+    assert bus.read_word_data(0x41, 0x1) == 0xe803
+    assert ina219.shunt_voltage() == 10.0
+    assert ina219.bus_voltage() == (12000, 0)
+    assert fake._registers[0x0] == ina219._build_config()
+
+
+def test_sampler_reads_only_new_conversions(ina, mocker):
+    fake, ina219 = ina
+    mocker.patch.object(INA219Sampler, '_clock', side_effect=[1.0, 2.0])
+    sampler = INA219Sampler(ina219, capacity=4)
+    sampler.start()
+    assert ina219.operating_mode == INA219.MODE_LOOKUP['shunt_and_bus_continuous']
+    assert sampler.poll() is False
+
+    fake.set_measurement(10.0, 5000)
+    assert sampler.poll() is True
+    assert sampler.poll() is False
+    fake.set_measurement(-2.5, 4996, overflow=True)
+    assert sampler.poll() is True
+    assert list(sampler.buffer) == [(1.0, 10.0, 5000.0, 0), (2.0, -2.5, 4996.0, 1)]
+    assert sampler.polls == 4
+
+
+def test_sampler_run_count(ina, mocker):
+    fake, ina219 = ina
+    sampler = INA219Sampler(ina219, capacity=2)
+    sampler.start()
+    # Simulate a conversion completing after each bus voltage read without one
+    read_conversion = ina219.read_conversion
+
+    def converting_read():
+        result = read_conversion()
+        if result is None:
+            fake.set_measurement(1.0, 3300)
+        return result
+    mocker.patch.object(ina219, 'read_conversion', side_effect=converting_read)
+    assert sampler.run(count=3) == 3
+    assert sampler.buffer.dropped == 1
+    assert len(sampler.buffer) == 2
+
+
+def test_uncalibrated_registers_raw(ina):
+    fake, ina219 = ina
+    fake.set_measurement(10.0, 12000)
+    assert ina219.current() == 0
+    assert ina219.power() == 0
+
+
+def test_calibrate(ina, mocker):
+    fake, ina219 = ina
+    write = mocker.spy(fake, 'write_word_data')
+    assert ina219.calibrate(0.1, 3.2) == 4194
+    # SMBus word, low byte first
+    write.assert_called_once_with(0x5, 0x6210)
+    assert ina219.current_lsb == pytest.approx(3.2 / 32768, rel=1e-3)
+    assert ina219.power_lsb == pytest.approx(20 * ina219.current_lsb)
+
+    fake.set_measurement(100.0, 12000)
+    assert ina219.current() == pytest.approx(1.0, abs=ina219.current_lsb)
+    assert ina219.power() == pytest.approx(12.0, abs=ina219.power_lsb)
+    fake.set_measurement(-50.0, 12000)
+    assert ina219.current() == pytest.approx(-0.5, abs=ina219.current_lsb)
+
+
+def test_calibration_register_decoded_from_wire_order(ina):
+    fake, ina219 = ina
+    calibration = ina219.calibrate(0.01, 10)
+    assert calibration & 0xff != calibration >> 8
+    # Fake decodes the low byte first SMBus word, so the chip holds the value calculated
+    assert fake._registers[0x5] == calibration
+    assert ina219._read_register(0x5) == calibration
+
+
+def test_calibrate_on_create():
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x40)
+    ina219 = INA219(bus, shunt_ohms=0.01, max_expected_amps=10)
+    fake.set_measurement(20.0, 5000)
+    assert ina219.current() == pytest.approx(2.0, abs=ina219.current_lsb)
+
+
+@pytest.mark.parametrize("shunt_ohms,max_expected_amps", [(0, 1), (0.1, -1), (100, 10), (0.001, 0.01)])
+def test_calibrate_invalid(ina, shunt_ohms, max_expected_amps):
+    fake, ina219 = ina
+    with pytest.raises(ValueError):
+        ina219.calibrate(shunt_ohms, max_expected_amps)
+
+
+def test_snapshot(ina, mocker):
+    fake, ina219 = ina
+    ina219.calibrate(0.1, 3.2)
+    fake.set_measurement(100.0, 12000)
+    reads = mocker.spy(fake, 'read_word_data')
+    snapshot = ina219.snapshot()
+    assert reads.call_count == 5
+    assert snapshot.shunt_voltage == 100.0
+    assert snapshot.bus_voltage == 12000
+    assert snapshot.current == pytest.approx(1.0, abs=ina219.current_lsb)
+    assert snapshot.power == pytest.approx(12.0, abs=ina219.power_lsb)
+    assert (snapshot.overflow, snapshot.ready) == (0, True)
+    # Power read cleared conversion ready
+    assert ina219.snapshot().ready is False
+
+
+def conversions_during_reads(fake, mocker, count):
+    """ New conversion lands after current is read, count times. """
+    read_word_data = fake.read_word_data
+    torn = [True] * count
+
+    def conversion_during_read(register):
+        value = read_word_data(register)
+        if register == 0x4 and torn:
+            torn.pop()
+            fake.set_measurement(50.0, 11000)
+        return value
+    return mocker.patch.object(fake, 'read_word_data', side_effect=conversion_during_read)
+
+
+@pytest.mark.parametrize("calibrated", [True, False])
+def test_snapshot_retries_torn_read(ina, mocker, calibrated):
+    fake, ina219 = ina
+    if calibrated:
+        ina219.calibrate(0.1, 3.2)
+    fake.set_measurement(100.0, 12000)
+    reads = conversions_during_reads(fake, mocker, 1)
+    snapshot = ina219.snapshot()
+    assert reads.call_count == 9
+    assert (snapshot.shunt_voltage, snapshot.bus_voltage, snapshot.ready) == (50.0, 11000, True)
+    if calibrated:
+        assert snapshot.current == pytest.approx(0.5, abs=ina219.current_lsb)
+    else:
+        # Raw register, zero until calibrated
+        assert snapshot.current == 0
+
+
+def test_snapshot_gives_up(ina, mocker):
+    fake, ina219 = ina
+    fake.set_measurement(100.0, 12000)
+    conversions_during_reads(fake, mocker, 2)
+    with pytest.raises(IOError):
+        ina219.snapshot(retries=1)
+
+
+@pytest.mark.parametrize("mode,bus_adc,shunt_adc,expected", [
+    ('shunt_and_bus_triggered', 0xa, 0xa, 0.00426),
+    ('shunt_triggered', 0x3, 0xf, 0.0681),
+    ('bus_continuous', 0x7, 0xf, 0.000532),
+    ('power_down', 0xf, 0xf, 0),
+])
+def test_conversion_time(mode, bus_adc, shunt_adc, expected):
+    bus = smbus.SMBus(1)
+    FakeINA219(bus, 0x40)
+    ina219 = INA219(bus, bus_adc=bus_adc, shunt_adc=shunt_adc, operating_mode=INA219.MODE_LOOKUP[mode])
+    assert ina219.conversion_time() == pytest.approx(expected)
+
+
+def test_trigger_requires_triggered_mode(ina):
+    fake, ina219 = ina
+    ina219.set_operating_mode(INA219.MODE_LOOKUP['shunt_and_bus_continuous'])
+    with pytest.raises(ValueError):
+        ina219.trigger()
+
+
+def test_triggered_snapshot_all_reads_in_completion_order(mocker):
+    clock = mocker.patch.object(INA219, '_clock', return_value=10.0)
+    sleep = mocker.patch('rpi_hardware.ina219.sleep',
+                         side_effect=lambda seconds: setattr(clock, 'return_value', clock.return_value + seconds))
+    devices = []
+    adc_settings = (INA219.ADC_12BIT_SAMPLE_LOOKUP[128], INA219.ADC_BIT_LOOKUP[9], INA219.ADC_12BIT_SAMPLE_LOOKUP[8])
+    for bus_number in (1, 2):
+        bus = smbus.SMBus(bus_number)
+        for offset, adc in enumerate(adc_settings):
+            fake = FakeINA219(bus, 0x40 + offset)
+            fake.set_measurement(offset + bus_number, 5000)
+            devices.append(INA219(bus, address=0x40 + offset, bus_adc=adc, shunt_adc=adc))
+    snapshot = mocker.spy(INA219, 'snapshot')
+
+    snapshots = triggered_snapshot_all(devices)
+    assert [s.shunt_voltage for s in snapshots] == [1, 2, 3, 2, 3, 4]
+    assert [call[0][0].address for call in snapshot.call_args_list] == [0x41, 0x41, 0x42, 0x42, 0x40, 0x40]
+    # Total wait is the longest conversion, not the sum
+    assert clock.return_value - 10.0 == pytest.approx(2 * 0.0681)
+    assert sleep.call_count == 3
+
+
+def test_create_writes_only_when_config_differs(mocker):
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x40)
+    write = mocker.spy(fake, 'write_word_data')
+    INA219(bus, operating_mode=0x7)
+    assert write.call_count == 1
+    # Device already configured, as after a service restart
+    INA219(bus, operating_mode=0x7)
+    assert write.call_count == 1
+
+
+def test_configure_skips_matching_calibration(mocker):
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x40)
+    INA219(bus, operating_mode=0x7, shunt_ohms=0.1, max_expected_amps=3.2)
+    write = mocker.spy(fake, 'write_word_data')
+    # Read back of config and calibration is swapped like the writes, so both match
+    ina219 = INA219(bus, operating_mode=0x7, shunt_ohms=0.1, max_expected_amps=3.2, lazy=True)
+    assert ina219.configure() is False
+    assert write.call_count == 0
+
+
+def test_configure_triggered_mode_starts_conversion(mocker):
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x40)
+    fake.set_measurement(10.0, 5000)
+    ina219 = INA219(bus, shunt_ohms=0.1, max_expected_amps=3.2)
+    ina219.read_conversion()
+    write = mocker.spy(fake, 'write_word_data')
+    # Config matches, but is written to start a fresh conversion
+    assert ina219.configure() is True
+    assert [call[0][0] for call in write.call_args_list] == [0x0]
+    assert ina219.read_conversion() is not None
+
+
+def test_lazy_configures_on_first_use(mocker):
+    bus = smbus.SMBus(1)
+    fake = FakeINA219(bus, 0x40)
+    read = mocker.spy(fake, 'read_word_data')
+    write = mocker.spy(fake, 'write_word_data')
+    ina219 = INA219(bus, lazy=True, shunt_ohms=0.1, max_expected_amps=3.2)
+    assert read.call_count == write.call_count == 0
+    fake.set_measurement(100.0, 5000)
+    assert ina219.current() == pytest.approx(1.0, abs=ina219.current_lsb)
+    assert [call[0][0] for call in write.call_args_list] == [0x5, 0x0]
+    ina219.current()
+    assert write.call_count == 2
+
+
+def test_configure_all(mocker):
+    devices = []
+    for bus_number in (1, 2):
+        bus = smbus.SMBus(bus_number)
+        for address in (0x40, 0x41):
+            FakeINA219(bus, address)
+            devices.append(INA219(bus, address=address, operating_mode=0x7, lazy=True))
+    # Already matching
+    devices[3].configure()
+    assert configure_all(devices) == [True, True, True, False]
+    assert all(device._configured for device in devices)
@@ -0,0 +1,71 @@
+import pytest
+
+from rpi_hardware import DS28CM00, HCF4094, INA219, TMP275
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeDS28CM00, FakeINA219, FakeTMP275, GPIO
+from rpi_hardware.util.metrics import MeteredGPIO, MeteredSMBus, OperationStats
+
+
+@pytest.fixture
+def bus():
+    bus = smbus.SMBus(1)
+    FakeTMP275(bus, 0x48, temperature=21.5)
+    FakeINA219(bus, 0x41).set_measurement(10.0, 5000)
+    FakeDS28CM00(bus, [1, 2, 3, 4, 5, 6])
+    return MeteredSMBus(bus, buckets=(0.5, 1.0))
+
+
+def test_counts_per_address_and_register(bus):
+    tmp = TMP275(bus, 0x48)
+    ina = INA219(bus, address=0x41)
+    for _ in range(3):
+        ina.shunt_voltage()
+    assert DS28CM00(bus).serial_number == hex(0x010203040506)
+    tmp.read_temperature()
+
+    stats = bus.snapshot()
+    assert stats[(0x41, 0x01)].count == 3
+    assert stats[(0x41, 0x01)].bytes == 6
+    assert stats[(0x50, 0x00)].count == 1
+    assert stats[(0x50, 0x00)].bytes == 8
+    assert sum(stats[(0x41, 0x01)].histogram) == 3
+    assert len(stats[(0x41, 0x01)].histogram) == 3
+    assert set(bus.by_address()) == {0x41, 0x48, 0x50}
+    assert bus.by_address()[0x41].count == sum(
+        value.count for (address, _), value in stats.items() if address == 0x41)
+
+
+def test_histogram_buckets(bus, mocker):
+    mocker.patch.object(MeteredSMBus, '_clock', side_effect=[0.0, 0.2, 0.0, 0.7, 0.0, 3.0])
+    for _ in range(3):
+        bus.read_word_data(0x41, 0x02)
+    assert bus.snapshot()[(0x41, 0x02)] == OperationStats(3, 6, 0, 3.9, (1, 1, 1))
+
+
+def test_errors_counted_and_raised(bus):
+    with pytest.raises(IOError):
+        bus.read_byte_data(0x60, 0x00)
+    assert bus.snapshot()[(0x60, 0x00)].errors == 1
+    bus.reset()
+    assert bus.snapshot() == {}
+
+
+def test_pointerless_reads_through_rdwr(bus):
+    tmp = TMP275(bus, 0x48)
+    tmp.read_temperature()
+    tmp.read_temperature()
+    assert bus.snapshot()[(0x48, None)].bytes == 2
+    assert bus.i2c_msg is smbus.i2c_msg
+
+
+def test_metered_gpio():
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    gpio = MeteredGPIO(GPIO)
+    hcf = HCF4094(gpio, 21, 26, 19, 20, enable_output_immediate=True)
+    hcf.shift_data([1, 0, 1])
+    stats = gpio.snapshot()
+    assert stats[('output', 26)].count == 6
+    assert stats[('output', 21)].count == 3
+    assert stats[('setup', 19)].count == 1
+    assert gpio.OUT == GPIO.OUT
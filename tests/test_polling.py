@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+
+from rpi_hardware import TMP275, INA219, SensorPoller
+from rpi_hardware.polling import Reading
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeTMP275, FakeINA219
+
+
+@pytest.fixture
+def clock(mocker):
+    return mocker.patch.object(SensorPoller, '_clock', return_value=100.0)
+
+
+@pytest.fixture
+def fleet():
+    bus_1 = smbus.SMBus(1)
+    bus_2 = smbus.SMBus(2)
+    FakeTMP275(bus_1, 0x48, temperature=20.0)
+    FakeTMP275(bus_1, 0x49, temperature=21.0)
+    fake_ina = FakeINA219(bus_2, 0x41)
+    fake_ina.set_measurement(10.0, 5000)
+    return TMP275(bus_1, 0x48), TMP275(bus_1, 0x49), INA219(bus_2, address=0x41)
+
+
+def test_schedule_by_period_and_priority(clock, fleet):
+    tmp_a, tmp_b, ina = fleet
+    poller = SensorPoller()
+    poller.add('tmp_a', tmp_a.read_temperature, period=1.0, priority=1)
+    poller.add('tmp_b', tmp_b.read_temperature, period=2.0, priority=0)
+    poller.add('bus', ina.bus_voltage, period=0.5)
+    readings = poller.run_once(100.0)
+    assert [reading.name for reading in readings] == ['tmp_b', 'tmp_a', 'bus']
+    assert poller.next_due() == 100.5
+
+    assert poller.run_once(100.2) == []
+    assert [reading.name for reading in poller.run_once(100.5)] == ['bus']
+    assert sorted(reading.name for reading in poller.run_once(101.0)) == ['bus', 'tmp_a']
+    assert sorted(reading.name for reading in poller.run_once(102.0)) == ['bus', 'tmp_a', 'tmp_b']
+    assert poller.latest('tmp_b') == Reading(100.0, 'tmp_b', 21.0)
+    assert poller.latest('bus').value.voltage == 5000
+
+
+def test_missed_reads_skipped(clock, fleet):
+    poller = SensorPoller()
+    poller.add('tmp_a', fleet[0].read_temperature, period=1.0)
+    poller.run_once(100.0)
+    assert len(poller.run_once(105.5)) == 1
+    assert poller.next_due() == 106.5
+
+
+def test_reads_grouped_per_bus(clock, fleet):
+    tmp_a, tmp_b, ina = fleet
+    poller = SensorPoller()
+    threads = {}
+    bus_1_reading = threading.Event()
+
+    def record(name, read):
+        def _read():
+            threads[name] = threading.current_thread()
+            if name == 'tmp_a':
+                bus_1_reading.set()
+            elif name == 'bus':
+                # Only returns if bus 1 is read at the same time
+                assert bus_1_reading.wait(5)
+            return read()
+        return _read
+
+    poller.add('tmp_a', record('tmp_a', tmp_a.read_temperature), period=1.0, bus=1)
+    poller.add('tmp_b', record('tmp_b', tmp_b.read_temperature), period=1.0, bus=1)
+    poller.add('bus', record('bus', ina.bus_voltage), period=1.0, bus=2)
+    assert len(poller.run_once(100.0)) == 3
+    poller.stop()
+    assert threads['tmp_a'] is threads['tmp_b']
+    assert threads['tmp_a'] is not threading.current_thread()
+
+
+def test_subscribers_and_errors(clock, fleet, mocker):
+    poller = SensorPoller()
+    callback = mocker.Mock()
+    poller.subscribe(callback)
+    poller.add('tmp_a', fleet[0].read_temperature, period=1.0)
+    poller.add('missing', TMP275(smbus.SMBus(3), 0x4a).read_temperature, period=1.0)
+    poller.run_once(100.0)
+    callback.assert_called_once_with(Reading(100.0, 'tmp_a', 20.0))
+    assert poller.errors == {'missing': 1}
+    assert poller.latest('missing') is None
+
+    poller.unsubscribe(callback)
+    poller.remove('missing')
+    poller.run_once(101.0)
+    assert callback.call_count == 1
+    assert poller.errors == {'missing': 1}
+    with pytest.raises(ValueError):
+        poller.add('tmp_a', fleet[0].read_temperature, period=1.0)
+    with pytest.raises(ValueError):
+        poller.add('tmp_c', fleet[0].read_temperature, period=0)
+
+
+def test_background_polling(fleet):
+    poller = SensorPoller()
+    received = threading.Event()
+    poller.subscribe(lambda reading: received.set())
+    poller.start()
+    poller.add('tmp_a', fleet[0].read_temperature, period=0.01)
+    assert received.wait(5)
+    poller.stop(5)
+    assert poller.latest('tmp_a').value == 20.0
+
+
+def test_unexpected_errors_keep_polling(fleet, caplog):
+    poller = SensorPoller()
+    received = []
+    enough = threading.Event()
+
+    def faulty_subscriber(reading):
+        raise RuntimeError('subscriber bug')
+
+    def subscriber(reading):
+        received.append(reading)
+        if len(received) >= 3:
+            enough.set()
+
+    def faulty_read():
+        raise ZeroDivisionError()
+
+    poller.subscribe(faulty_subscriber)
+    poller.subscribe(subscriber)
+    poller.add('faulty', faulty_read, period=0.01, bus='other')
+    poller.add('tmp_a', fleet[0].read_temperature, period=0.01)
+    poller.start()
+    assert enough.wait(5)
+    assert poller._thread.is_alive()
+    poller.stop(5)
+    assert {reading.name for reading in received} == {'tmp_a'}
+    assert poller.errors['faulty'] >= 1
+    assert poller.subscriber_errors >= 3
+    assert 'Unexpected error reading sensor faulty' in caplog.text
+    assert 'subscriber bug' in caplog.text
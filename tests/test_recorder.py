@@ -0,0 +1,132 @@
+import pytest
+
+from rpi_hardware import HCF4094, INA219, TMP275, DS28CM00
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeDS28CM00, FakeINA219, FakeTMP275, GPIO
+from rpi_hardware.mocked.replay import ReplayGPIO, ReplayMismatch, ReplaySMBus
+from rpi_hardware.util.recorder import TrafficRecorder, read_log
+
+
+def drive(bus, gpio=None):
+    tmp = TMP275(bus, 0x48)
+    tmp.write_configuration(bit_resolution=12)
+    ina = INA219(bus, address=0x41)
+    readings = [tmp.read_temperature(), tmp.read_temperature(), ina.shunt_voltage(), ina.bus_voltage().voltage,
+                DS28CM00(bus).serial_number]
+    if gpio is not None:
+        hcf = HCF4094(gpio, 21, 26, 19, 20, enable_output_immediate=True)
+        hcf.shift_data([1, 0, 1])
+        gpio.setup(17, gpio.IN, pull_up_down=gpio.PUD_UP)
+        readings.append(gpio.input(17))
+    return readings
+
+
+@pytest.fixture
+def recording(tmpdir):
+    path = str(tmpdir.join('traffic.bin'))
+    bus = smbus.SMBus(1)
+    FakeTMP275(bus, 0x48, temperature=21.5)
+    FakeINA219(bus, 0x41).set_measurement(-12.5, 5000)
+    FakeDS28CM00(bus, [1, 2, 3, 4, 5, 6])
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    with TrafficRecorder(path) as recorder:
+        readings = drive(recorder.smbus(bus), recorder.gpio(GPIO))
+        with pytest.raises(IOError):
+            recorder.smbus(bus, channel=0).read_byte(0x60)
+    return path, readings
+
+
+def test_replay_matches_recording(recording):
+    path, readings = recording
+    bus = ReplaySMBus(path)
+    gpio = ReplayGPIO(path, channel=1)
+    assert drive(bus, gpio) == readings
+    with pytest.raises(IOError):
+        bus.read_byte(0x60)
+    assert bus.finished
+    assert gpio.finished
+    with pytest.raises(ReplayMismatch):
+        bus.read_byte(0x60)
+
+
+def test_log_records(recording):
+    path, _ = recording
+    records = list(read_log(path))
+    assert [record.channel for record in records[:2]] == [0, 0]
+    config_write = records[0]
+    assert (config_write.operation, config_write.address, config_write.register) == ('write_byte_data', 0x48, 0x01)
+    rdwr = [record for record in records if record.operation == 'i2c_rdwr']
+    assert rdwr and rdwr[0].register is None and len(rdwr[0].read) == 2
+    assert records[-1].errno != 0
+    assert all(later.timestamp >= earlier.timestamp for earlier, later in zip(records, records[1:]))
+
+
+def test_mismatch_detected(recording):
+    path, _ = recording
+    bus = ReplaySMBus(path)
+    with pytest.raises(ReplayMismatch):
+        TMP275(bus, 0x48).write_configuration(bit_resolution=9)
+    with pytest.raises(ReplayMismatch):
+        bus.read_word_data(0x41, 0x01)
+    relaxed = ReplaySMBus(path, strict=False)
+    TMP275(relaxed, 0x48).write_configuration(bit_resolution=9)
+
+
+def test_realtime_replay(recording, mocker):
+    path, _ = recording
+    bus = ReplaySMBus(path, realtime=True)
+    sleep = mocker.patch('rpi_hardware.mocked.replay.sleep')
+    mocker.patch.object(ReplaySMBus, '_clock', return_value=50.0)
+    drive(bus)
+    records = [record for record in read_log(path) if record.channel == 0]
+    assert sleep.call_count == sum(1 for record in records[1:-1] if record.timestamp > records[0].timestamp)
+    assert sleep.call_args[0][0] == pytest.approx(records[-2].timestamp - records[0].timestamp)
+
+
+def test_not_a_log(tmpdir):
+    path = tmpdir.join('other.bin')
+    path.write_binary(b'\0' * 32)
+    with pytest.raises(ValueError):
+        ReplaySMBus(str(path))
+
+
+def test_log_readable_before_close(tmpdir):
+    path = str(tmpdir.join('traffic.bin'))
+    bus = smbus.SMBus(1)
+    FakeTMP275(bus, 0x48, temperature=21.5)
+    recorder = TrafficRecorder(path)
+    tmp = TMP275(recorder.smbus(bus), 0x48)
+    tmp.read_temperature()
+    assert [record.operation for record in read_log(path)] == ['read_word_data']
+    replay = ReplaySMBus(path)
+    assert TMP275(replay, 0x48).read_temperature() == 21.5
+    assert replay.finished
+    recorder.close()
+    with pytest.raises(ValueError):
+        TrafficRecorder(path, flush_interval=-1)
+
+
+def test_truncated_record_ends_log(recording, tmpdir):
+    path, _ = recording
+    records = list(read_log(path))
+    with open(path, 'rb') as log_file:
+        data = log_file.read()
+    for cut in (1, 10, 17):
+        truncated = tmpdir.join('truncated{}.bin'.format(cut))
+        truncated.write_binary(data[:-cut])
+        assert list(read_log(str(truncated))) == records[:-1]
+
+
+def test_replay_reads_log_lazily(recording, mocker):
+    path, _ = recording
+    recorded = list(read_log(path))
+    records = iter(recorded)
+    mocker.patch('rpi_hardware.mocked.replay.read_log', return_value=records)
+    bus = ReplaySMBus(path)
+    # Only the first record has been read
+    assert next(records) == recorded[1]
+    bus.close()
+    assert bus.finished
+    with pytest.raises(ReplayMismatch):
+        bus.read_word_data(0x48, 0x00)
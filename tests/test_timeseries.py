@@ -0,0 +1,70 @@
+import pytest
+
+from rpi_hardware.timeseries import TimeSeriesStore
+
+
+def test_memory_store_ring():
+    store = TimeSeriesStore(capacity=3)
+    assert list(store) == []
+    store.append(0.5, 1, 0x1900)
+    store.append(1.5, 2, 0x1910)
+    assert list(store) == [(0.5, 1, 0x1900), (1.5, 2, 0x1910)]
+    store.append(2.5, 1, 0x1920)
+    store.append(3.5, 2, 0x1930)
+    assert list(store) == [(1.5, 2, 0x1910), (2.5, 1, 0x1920), (3.5, 2, 0x1930)]
+    assert list(store.column('raw')) == [0x1910, 0x1920, 0x1930]
+    assert (len(store), store.total, store.dropped, store.head) == (3, 4, 1, 1)
+    assert store.view('timestamp').tolist() == [3.5, 1.5, 2.5]
+    store.close()
+
+
+def test_file_store_survives_reopen(tmpdir):
+    path = str(tmpdir.join('samples.ts'))
+    with TimeSeriesStore(path, capacity=4) as store:
+        for index in range(6):
+            store.append(100.0 + index, index % 2, index)
+        store.flush()
+    with TimeSeriesStore(path) as store:
+        assert store.capacity == 4
+        assert store.total == 6
+        assert list(store.column('raw')) == [2, 3, 4, 5]
+        store.append(106.0, 0, 6)
+    with TimeSeriesStore(path, capacity=4) as store:
+        assert list(store.column('timestamp')) == [103.0, 104.0, 105.0, 106.0]
+    with pytest.raises(ValueError):
+        TimeSeriesStore(path, capacity=5)
+
+
+def test_reader_sees_writer(tmpdir):
+    path = str(tmpdir.join('samples.ts'))
+    writer = TimeSeriesStore(path, capacity=8)
+    reader = TimeSeriesStore(path, readonly=True)
+    view = reader.view('raw')
+    writer.append(1.0, 7, 0x1234)
+    assert reader.total == 1
+    assert view[0] == 0x1234
+    assert list(reader) == [(1.0, 7, 0x1234)]
+    with pytest.raises(TypeError):
+        view[0] = 0
+    reader.close()
+    writer.close()
+
+
+def test_not_a_store(tmpdir):
+    path = tmpdir.join('other.bin')
+    path.write_binary(b'\0' * 64)
+    with pytest.raises(ValueError):
+        TimeSeriesStore(str(path))
+    with pytest.raises(ValueError):
+        TimeSeriesStore(capacity=0)
+
+
+def test_as_numpy_is_zero_copy():
+    numpy = pytest.importorskip('numpy')
+    store = TimeSeriesStore(capacity=4)
+    raw = store.as_numpy('raw')
+    store.append(1.0, 1, 0x1900)
+    assert raw.dtype == numpy.uint16
+    assert raw[0] == 0x1900
+    del raw
+    store.close()
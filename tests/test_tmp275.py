@@ -0,0 +1,220 @@
+import pytest
+
+from rpi_hardware import TMP275
+from rpi_hardware.tmp275 import TMP275AlertMonitor, one_shot_all
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeTMP275, GPIO
+
+
+@pytest.fixture
+def clock(mocker):
+    return mocker.patch.object(TMP275, '_clock', return_value=100.0)
+
+
+@pytest.fixture
+def sleep(mocker, clock):
+    def advance_clock(seconds):
+        clock.return_value += seconds
+    return mocker.patch('rpi_hardware.tmp275.sleep', side_effect=advance_clock)
+
+
+@pytest.fixture
+def sensor():
+    bus = smbus.SMBus(1)
+    fake = FakeTMP275(bus, 0x49, temperature=21.5)
+    return fake, TMP275(bus, 0x49)
+
+
+def test_read_temperature(sensor):
+    fake, tmp = sensor
+    assert tmp.read_temperature() == 21.5
+    fake.temperature = -10.25
+    tmp.write_configuration(bit_resolution=12)
+    assert tmp.read_temperature() == -10.25
+
+
+def test_conversion_time_follows_configuration(sensor, clock):
+    fake, tmp = sensor
+    assert tmp.bit_resolution == 9
+    assert tmp.conversion_time == 0.0275
+    tmp.write_configuration(bit_resolution=12)
+    assert tmp.bit_resolution == 12
+    assert tmp.next_sample_time == pytest.approx(100.22)
+
+
+def test_sample_temperature_cached_until_conversion(sensor, clock, mocker):
+    fake, tmp = sensor
+    tmp.write_configuration(bit_resolution=12)
+    reads = mocker.spy(tmp, 'read_temperature')
+
+    clock.return_value = 100.1
+    assert tmp.sample_temperature() == 21.5
+    assert tmp.next_sample_time == pytest.approx(100.22)
+    fake.temperature = 30
+    clock.return_value = 100.2
+    assert tmp.sample_temperature() == 21.5
+    assert reads.call_count == 1
+
+    # Next fresh sample stays aligned to conversion boundaries
+    clock.return_value = 100.25
+    assert tmp.sample_temperature() == 30
+    assert tmp.next_sample_time == pytest.approx(100.44)
+    assert reads.call_count == 2
+
+
+def test_sample_temperature_shutdown_mode(sensor, clock, mocker):
+    fake, tmp = sensor
+    tmp.write_configuration(shutdown_mode=1)
+    assert tmp.next_sample_time is None
+    reads = mocker.spy(tmp, 'read_temperature')
+    tmp.sample_temperature()
+    clock.return_value = 200.0
+    tmp.sample_temperature()
+    assert reads.call_count == 1
+
+
+def test_one_shot_requires_shutdown(sensor, mocker):
+    fake, tmp = sensor
+    with pytest.raises(ValueError):
+        tmp.trigger_one_shot()
+    # Continuous conversions are read directly, without a one shot
+    write = mocker.spy(fake, 'write_byte_data')
+    assert tmp.one_shot() == 21.5
+    assert write.call_count == 0
+    with pytest.raises(ValueError):
+        tmp.collect_one_shot()
+
+
+def test_one_shot_sets_os_bit_and_waits(sensor, sleep, mocker):
+    fake, tmp = sensor
+    tmp.write_configuration(shutdown_mode=1, bit_resolution=10)
+    fake.temperature = 40.5
+    assert tmp.read_temperature() == 21.5
+
+    write = mocker.spy(fake, 'write_byte_data')
+    assert tmp.one_shot() == 40.5
+    write.assert_called_once_with(0x1, 0b10100001)
+    sleep.assert_called_once_with(pytest.approx(0.075))
+
+
+def test_one_shot_all_waits_once(sleep):
+    sensors = []
+    for bus_number in (1, 2):
+        bus = smbus.SMBus(bus_number)
+        for address, resolution in ((0x48, 9), (0x4f, 12)):
+            FakeTMP275(bus, address, temperature=bus_number * 10 + address - 0x48)
+            tmp = TMP275(bus, address)
+            tmp.write_configuration(shutdown_mode=1, bit_resolution=resolution)
+            sensors.append(tmp)
+    assert one_shot_all(sensors) == [10, 17, 20, 27]
+    # Slowest sensor's maximum conversion time
+    sleep.assert_called_once_with(pytest.approx(0.3))
+
+
+def test_unchanged_writes_skipped(sensor, mocker):
+    fake, tmp = sensor
+    byte_write = mocker.spy(fake, 'write_byte_data')
+    word_write = mocker.spy(fake, 'write_word_data')
+    tmp.write_configuration(bit_resolution=11)
+    tmp.write_configuration(bit_resolution=11)
+    assert byte_write.call_count == 1
+    tmp.write_t_high_register(60)
+    tmp.write_t_high_register(60)
+    assert word_write.call_count == 1
+
+    tmp.forget_shadow()
+    tmp.write_configuration(bit_resolution=11)
+    assert byte_write.call_count == 2
+
+
+def test_pointerless_temperature_reads(sensor, mocker):
+    fake, tmp = sensor
+    word_read = mocker.spy(fake, 'read_word_data')
+    raw_read = mocker.spy(fake, 'i2c_read')
+    assert tmp.read_temperature() == 21.5
+    fake.temperature = 22
+    assert tmp.read_temperature() == 22
+    assert word_read.call_count == 1
+    assert raw_read.call_count == 1
+
+    # Pointer moved by config write, so must be set again
+    tmp.write_configuration(bit_resolution=12)
+    tmp.read_temperature()
+    assert word_read.call_count == 2
+
+
+def test_word_and_pointerless_reads_agree():
+    bus = smbus.SMBus(1)
+    fake = FakeTMP275(bus, 0x48, temperature=25.0625)
+    tmp = TMP275(bus, 0x48)
+    tmp.write_configuration(bit_resolution=12)
+    # Register 0x1910 arrives from SMBus read_word_data low byte first
+    assert bus.read_word_data(0x48, 0x00) == 0x1019
+    assert tmp.read_temperature() == 25.0625
+    assert tmp.read_temperature() == 25.0625
+    fake.temperature = -10.25
+    tmp.forget_shadow()
+    assert tmp.read_temperature() == -10.25
+    assert tmp.read_temperature() == -10.25
+
+
+def test_threshold_words_sent_low_byte_first(mocker):
+    bus = smbus.SMBus(1)
+    fake = FakeTMP275(bus, 0x49)
+    tmp = TMP275(bus, 0x49)
+    word_write = mocker.spy(bus, 'write_word_data')
+    tmp.write_t_high_register(25.0625)
+    word_write.assert_called_once_with(0x49, 0x03, 0x1019)
+    assert fake._registers[0x03] == 0x1910
+
+
+@pytest.fixture
+def gpio():
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    return GPIO
+
+
+def test_fake_alert_comparator_mode(gpio):
+    bus = smbus.SMBus(1)
+    fake = FakeTMP275(bus, 0x48, temperature=25, gpio_ref=gpio, alert_pin=17)
+    assert gpio.input(17) == gpio.HIGH
+    fake.temperature = 80
+    assert fake.alert_active and gpio.input(17) == gpio.LOW
+    fake.temperature = 76
+    assert fake.alert_active
+    fake.temperature = 74
+    assert gpio.input(17) == gpio.HIGH
+
+
+def test_alert_monitor_reads_only_alerting_sensor(gpio, mocker):
+    bus = smbus.SMBus(1)
+    callback = mocker.Mock()
+    monitor = TMP275AlertMonitor(gpio, callback)
+    fakes, sensors = [], []
+    for address, pin in ((0x48, 17), (0x49, 27)):
+        fakes.append(FakeTMP275(bus, address, temperature=25, gpio_ref=gpio, alert_pin=pin))
+        sensor = TMP275(bus, address)
+        sensor.write_configuration(thermostat_mode=1)
+        sensor.write_t_low_register(30)
+        sensor.write_t_high_register(50)
+        monitor.add_sensor(pin, sensor)
+        sensors.append(sensor)
+    reads = [mocker.spy(sensor, 'read_temperature') for sensor in sensors]
+
+    fakes[1].temperature = 55
+    callback.assert_called_once_with(sensors[1], 55)
+    assert reads[0].call_count == 0
+    # Read cleared interrupt
+    assert not fakes[1].alert_active
+    assert gpio.input(27) == gpio.HIGH
+
+    # Still hot, interrupt mode waits for temperature below T low
+    fakes[1].temperature = 60
+    assert callback.call_count == 1
+    fakes[1].temperature = 29
+    callback.assert_called_with(sensors[1], 29)
+
+    monitor.close()
+    fakes[0].temperature = 90
+    assert callback.call_count == 2
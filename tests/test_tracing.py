@@ -0,0 +1,79 @@
+import pytest
+
+from rpi_hardware import INA219, TMP275
+from rpi_hardware.mocked import smbus
+from rpi_hardware.mocked import FakeINA219, FakeTMP275
+from rpi_hardware.util import tracing
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.enable(capacity=4)
+    yield tracer
+    tracing.disable()
+
+
+@pytest.fixture
+def bus():
+    bus = smbus.SMBus(1)
+    FakeINA219(bus, 0x44).set_measurement(1.5, 3300)
+    FakeTMP275(bus, 0x48, temperature=30)
+    return bus
+
+
+def test_disabled_records_nothing(bus, capsys):
+    assert tracing.tracer is None
+    ina219 = INA219(bus, address=0x44, debug=True)
+    ina219.shunt_voltage()
+    ina219.bus_voltage()
+    assert capsys.readouterr().out == ''
+
+
+def test_records_driver_events(bus, tracer, capsys):
+    ina219 = INA219(bus, address=0x44)
+    assert ina219.shunt_voltage() == 1.5
+    TMP275(bus, 0x48).read_temperature()
+    events = tracer.snapshot()
+    assert [(e.device, e.address, e.register) for e in events] == [
+        ('INA219', 0x44, 0x0), ('INA219', 0x44, 0x1), ('TMP275', 0x48, 0x0)]
+    assert (events[1].raw, events[1].value) == (150, 1.5)
+    assert events[2].value == 30
+    assert all(event.duration >= 0 for event in events)
+    assert capsys.readouterr().out == ''
+
+
+def test_ring_buffer_keeps_newest(bus, tracer):
+    ina219 = INA219(bus, address=0x44)
+    for _ in range(5):
+        ina219.bus_voltage()
+    assert len(tracer.snapshot()) == 4
+    assert tracing.disable() is tracer
+    ina219.bus_voltage()
+    assert len(tracer.snapshot()) == 4
+
+
+def test_records_hot_path_events(bus):
+    fake = FakeINA219(bus, 0x45)
+    tracer = tracing.enable()
+    try:
+        ina219 = INA219(bus, address=0x45, operating_mode=0x7, shunt_ohms=0.1, max_expected_amps=3.2)
+        assert [(e.register, e.value) for e in tracer.snapshot()] == [(0x5, 0), (0x5, None), (0x0, 0x399f),
+                                                                      (0x0, None)]
+        fake.set_measurement(1.5, 3300)
+        tracer.clear()
+        ina219.read_conversion()
+        assert [(e.register, e.value) for e in tracer.snapshot()] == [(0x2, 3300), (0x1, 1.5), (0x3, 25)]
+        tracer.clear()
+        ina219.snapshot()
+        assert [e.register for e in tracer.snapshot()] == [0x2, 0x3, 0x1, 0x4, 0x2]
+        tracer.clear()
+
+        tmp = TMP275(bus, 0x48)
+        tmp.write_configuration(shutdown_mode=1)
+        tracer.clear()
+        assert tmp.one_shot() == 30
+        events = tracer.snapshot()
+        assert [(e.device, e.register, e.raw, e.value) for e in events] == [
+            ('TMP275', 0x1, 0x81, None), ('TMP275', 0x0, 0x1e00, 30)]
+    finally:
+        tracing.disable()
@@ -1,8 +1,11 @@
+import threading
+
 import pytest
 import time
 
 from rpi_hardware.util.singleton import Singleton
-from rpi_hardware.util.decorators import cached_with_immediate
+from rpi_hardware.util.decorators import cached_with_immediate, ttl_cache, single_flight_cache, _TtlCache
+from rpi_hardware.util.ring_buffer import RingBuffer
 
 
 class SingletonTest(Singleton):
@@ -41,3 +44,175 @@ def test_cached_with_immediate():
     # Ignore cache and get current value
     time_d = get_time(immediate=True)
     assert time_d > time_c
+
+
+def test_ring_buffer():
+    ring = RingBuffer(3, (('time', 'd'), ('value', 'H')))
+    assert list(ring) == []
+    ring.append(0.5, 1)
+    ring.append(1.5, 2)
+    assert list(ring) == [(0.5, 1), (1.5, 2)]
+    ring.append(2.5, 3)
+    assert list(ring.column('value')) == [1, 2, 3]
+    ring.append(3.5, 4)
+    assert list(ring) == [(1.5, 2), (2.5, 3), (3.5, 4)]
+    assert ring.column('time').typecode == 'd'
+    assert (len(ring), ring.total, ring.dropped) == (3, 4, 1)
+
+
+class CachedReader(object):
+    def __init__(self, value):
+        self.value = value
+        self.reads = 0
+
+    @ttl_cache(ttl=1, maxsize=4)
+    def read(self, offset=0):
+        self.reads += 1
+        return self.value + offset
+
+
+@pytest.fixture
+def clock(mocker):
+    return mocker.patch.object(_TtlCache, '_clock', return_value=100.0)
+
+
+def test_ttl_cache_per_instance_and_arguments(clock):
+    readers = [CachedReader(value) for value in range(3)]
+    assert [reader.read() for reader in readers] == [0, 1, 2]
+    assert [reader.read() for reader in readers] == [0, 1, 2]
+    assert [reader.reads for reader in readers] == [1, 1, 1]
+    assert readers[1].read(offset=10) == 11
+    assert readers[1].read(10) == 11
+    assert readers[1].reads == 3
+
+
+def test_ttl_cache_expires_and_immediate(clock):
+    reader = CachedReader(5)
+    reader.read()
+    reader.value = 6
+    clock.return_value = 101.0
+    assert reader.read() == 5
+    clock.return_value = 101.5
+    assert reader.read() == 6
+    reader.value = 7
+    assert reader.read(immediate=True) == 7
+    assert reader.read() == 7
+    assert reader.reads == 3
+
+
+def test_ttl_cache_lru_eviction(clock):
+    reader = CachedReader(0)
+    CachedReader.read.cache_clear()
+    for offset in range(4):
+        reader.read(offset)
+    reader.read(0)
+    reader.read(4)
+    assert len(CachedReader.read.cache) == 4
+    reads = reader.reads
+    reader.read(0)
+    assert reader.reads == reads
+    reader.read(1)
+    assert reader.reads == reads + 1
+
+
+class SlowReader(object):
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.reads = 0
+        self.fail = False
+
+    def _read(self):
+        self.reads += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise IOError('bus error')
+        return self.reads
+
+    @single_flight_cache(ttl=1)
+    def read(self):
+        return self._read()
+
+    @single_flight_cache(ttl=1, stale_while_revalidate=True)
+    def read_stale(self):
+        return self._read()
+
+
+def _run_threads(target, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_single_flight_shares_read(clock):
+    reader = SlowReader()
+    threads, results = _run_threads(reader.read, 5)
+    reader.started.wait(5)
+    time.sleep(0.05)
+    reader.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [1] * 5
+    assert reader.reads == 1
+    assert reader.read() == 1
+
+
+def test_single_flight_shares_error(clock):
+    reader = SlowReader()
+    reader.fail = True
+    reader.release.set()
+    with pytest.raises(IOError):
+        reader.read()
+    reader.fail = False
+    assert reader.read() == 2
+
+
+def test_stale_while_revalidate(clock):
+    reader = SlowReader()
+    reader.release.set()
+    assert reader.read_stale() == 1
+    clock.return_value = 102.0
+    reader.release.clear()
+    reader.started.clear()
+    assert reader.read_stale() == 1
+    reader.started.wait(5)
+    assert reader.read_stale() == 1
+    reader.release.set()
+    for _ in range(100):
+        if reader.read_stale() == 2:
+            break
+        time.sleep(0.01)
+    assert reader.read_stale() == 2
+    assert reader.reads == 2
+
+
+def test_stale_while_revalidate_single_refresh(clock):
+    reader = SlowReader()
+    reader.release.set()
+    assert reader.read_stale() == 1
+    clock.return_value = 102.0
+    reader.release.clear()
+    threads, results = _run_threads(reader.read_stale, 10)
+    for thread in threads:
+        thread.join(5)
+    assert results == [1] * 10
+    reader.release.set()
+    for _ in range(100):
+        if reader.read_stale() == 2:
+            break
+        time.sleep(0.01)
+    assert reader.reads == 2
+
+
+def test_single_flight_immediate_makes_own_read(clock):
+    reader = SlowReader()
+    threads, _ = _run_threads(reader.read, 1)
+    reader.started.wait(5)
+    reader.release.set()
+    reader.read(immediate=True)
+    threads[0].join(5)
+    # Not joined to the read in progress
+    assert reader.reads == 2